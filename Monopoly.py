@@ -1,247 +1,532 @@
 # Mehrad Hajati
 
+import argparse
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from statistics import NormalDist
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+# how many sampled indices to hold in memory at once while bootstrapping
+# resamples are drawn in 2-D batches of (rows x games) that stay under this size
+BOOTSTRAP_CHUNK_SIZE = 2**22
+
+# holds the results of bootstrapping a set of games - the three headline stats,
+# the value of each stat for every resample, and percentile confidence intervals
+# also how many of the games were censored (cut off before anyone won)
+class BootstrapResult:
+    def __init__(self, mean_turns_passed, mean_trip_last_property_bought, percent_all_props_bought,
+                 turns_distribution, trips_distribution, percent_distribution, confidence,
+                 num_games, num_censored, censored_included):
+        self.num_games = num_games
+        self.num_censored = num_censored
+        self.percent_censored = 100 * num_censored / num_games if num_games > 0 else np.nan
+        self.censored_included = censored_included
+        self.mean_turns_passed = mean_turns_passed
+        self.mean_trip_last_property_bought = mean_trip_last_property_bought
+        self.percent_all_props_bought = percent_all_props_bought
+        self.turns_distribution = turns_distribution
+        self.trips_distribution = trips_distribution
+        self.percent_distribution = percent_distribution
+        self.confidence = confidence
+        self.turns_interval = percentile_interval(turns_distribution, confidence)
+        self.trips_interval = percentile_interval(trips_distribution, confidence)
+        self.percent_interval = percentile_interval(percent_distribution, confidence)
+
+# lower and upper percentile bounds of a bootstrap distribution for a given confidence level
+# resamples with no defined value (nan) are left out
+def percentile_interval(distribution, confidence):
+    if np.all(np.isnan(distribution)):
+        return (np.nan, np.nan)
+    tail = (100 - confidence) / 2
+    lower, upper = np.nanpercentile(distribution, [tail, 100 - tail])
+    return (float(lower), float(upper))
+
+# pull the columns we bootstrap out of the game stats, either from a list of Stats
+# objects or straight from a structured array of stats with the same field names
+# arrays saved before games could be censored have no censored field, none of those games were
+def stats_columns(game_array):
+    if isinstance(game_array, np.ndarray):
+        turns = np.asarray(game_array["num_turns_passed"], dtype=np.int64)
+        trips = np.asarray(game_array["trip_last_property_bought"], dtype=np.int64)
+        if "censored" in game_array.dtype.names:
+            censored = np.asarray(game_array["censored"], dtype=bool)
+        else:
+            censored = np.zeros(len(turns), dtype=bool)
+    else:
+        turns = np.fromiter((stats.num_turns_passed for stats in game_array), dtype=np.int64, count=len(game_array))
+        trips = np.fromiter((stats.trip_last_property_bought for stats in game_array), dtype=np.int64, count=len(game_array))
+        censored = np.fromiter((stats.censored for stats in game_array), dtype=bool, count=len(game_array))
+    return turns, trips, censored
 
 # From an array of stats from many games, work up all the data we need
-def bootstrap_stats(game_array, degree):
-
-    # collect these values from each randomly sampled game - to calculate means in return
-    bootstrapped_turns = []
-    bootstrapped_trips_until_props_bought = []
-
-    # count how many games end without all the properties being bought
-    games_ended_without_all_props_bought = 0
-    
-    # bootstrap a number of times defined by the degree of bootstrapping
-    for i in range (degree):
-        
-        # create an array of randomly sampled (with replacement) indices
-        # amount equal to the number in the original array
-        random_sample_indices = np.random.randint(0, len(game_array), len(game_array))
-
-        # for each random index selected, do all the work for the stats for that game
-        for j in range (len(random_sample_indices)):
-
-            # add number of turns passed from this game, use the randomly sampled ones later to calculate a mean
-            bootstrapped_turns.append(game_array[random_sample_indices[j]].num_turns_passed)
-
-            # some games end without all the properties being bought - count them so we can get a percentage
-            if game_array[random_sample_indices[j]].trip_last_property_bought == -1:
-                games_ended_without_all_props_bought +=1
-
-            # add number of trips for games where all properties were bought to array to calculate the mean later
-            else:
-                bootstrapped_trips_until_props_bought.append(game_array[random_sample_indices[j]].trip_last_property_bought)
+# censored games only give a lower bound on how long a game lasts, so by default they are
+# left out of the stats and only counted; include_censored bootstraps them along with the rest
+def bootstrap_stats(game_array, degree, confidence=95, rng=None, include_censored=False):
+    if rng is None:
+        rng = np.random.default_rng()
+
+    turns, trips, censored = stats_columns(game_array)
+    num_censored = int(censored.sum())
+    num_all_games = len(turns)
+    if not include_censored:
+        turns = turns[~censored]
+        trips = trips[~censored]
+    num_games = len(turns)
+
+    # the value of each stat for every resample
+    # with no games left to resample (every game censored) there is nothing to estimate
+    if num_games == 0:
+        nothing = np.full(degree, np.nan)
+        return BootstrapResult(np.nan, np.nan, np.nan, nothing, nothing, nothing, confidence,
+                               num_all_games, num_censored, include_censored)
+    turns_distribution = np.empty(degree)
+    trips_distribution = np.empty(degree)
+    percent_distribution = np.empty(degree)
+
+    # running totals over every resample, to pool the stats at the end
+    # games where not every property was bought (trip of -1) are left out of the trips mean
+    total_trips = 0
+    total_games_all_props_bought = 0
+
+    # bootstrap a number of times defined by the degree of bootstrapping, a chunk of resamples at a time
+    rows_per_chunk = max(1, BOOTSTRAP_CHUNK_SIZE // num_games)
+    for first_row in range(0, degree, rows_per_chunk):
+        rows = min(rows_per_chunk, degree - first_row)
+        chunk = slice(first_row, first_row + rows)
+
+        # each row is one resample: randomly sampled (with replacement) indices,
+        # amount equal to the number of games in the original array
+        random_sample_indices = rng.integers(0, num_games, size=(rows, num_games))
+
+        turns_distribution[chunk] = turns[random_sample_indices].mean(axis=1)
+
+        sampled_trips = trips[random_sample_indices]
+        all_props_bought = sampled_trips != -1
+        games_all_props_bought = all_props_bought.sum(axis=1)
+        trips_sum = np.where(all_props_bought, sampled_trips, 0).sum(axis=1)
+
+        # a resample where no game had all properties bought has no trips mean
+        trips_distribution[chunk] = np.divide(trips_sum, games_all_props_bought, out=np.full(rows, np.nan),
+                                              where=games_all_props_bought > 0)
+        percent_distribution[chunk] = 100 * games_all_props_bought / num_games
+
+        total_trips += int(trips_sum.sum())
+        total_games_all_props_bought += int(games_all_props_bought.sum())
+
+    # every resample is the same size, so the mean of the resample means is the mean over all samples
+    mean_turns_passed = turns_distribution.mean()
+    if total_games_all_props_bought > 0:
+        mean_trip_last_property_bought = total_trips / total_games_all_props_bought
+    else:
+        mean_trip_last_property_bought = np.nan
 
     # report a percentage of games where the properties were all bought
-    percent_game_all_props_bought = 100 * (1 - (games_ended_without_all_props_bought / (len(game_array) * degree)))
-        
+    percent_all_props_bought = 100 * (total_games_all_props_bought / (num_games * degree))
+
     # return all stats
-    return np.mean(bootstrapped_turns), np.mean(bootstrapped_trips_until_props_bought), percent_game_all_props_bought
+    return BootstrapResult(mean_turns_passed, mean_trip_last_property_bought, percent_all_props_bought,
+                           turns_distribution, trips_distribution, percent_distribution, confidence,
+                           num_all_games, num_censored, include_censored)
 
+# censored is True for a game that was cut off by its turn budget or for stalling, before anyone won
+# counters holds the GameCounters of an instrumented game, None otherwise
 class Stats:
-    def __init__(self, winner, num_turns_passed, turn_last_property_bought, num_trips_around, trip_last_property_bought):
+    __slots__ = ("winner", "num_turns_passed", "turn_last_property_bought", "num_trips_around", "trip_last_property_bought",
+                 "censored", "counters")
+
+    def __init__(self, winner, num_turns_passed, turn_last_property_bought, num_trips_around, trip_last_property_bought,
+                 censored=False, counters=None):
         self.winner = winner
         self.num_turns_passed = num_turns_passed
         self.turn_last_property_bought = turn_last_property_bought
         self.num_trips_around = num_trips_around
         self.trip_last_property_bought = trip_last_property_bought
+        self.censored = censored
+        self.counters = counters
+
+# the rules a set of games is played with - how many players, the two optional
+# rules, and how many rounds pass before rent goes up
+# also when to give up on a game: after max_turns turns, or after stall_rounds rounds
+# with nobody eliminated (None for no limit)
+class Ruleset:
+    __slots__ = ("num_players", "properties_auctioned", "free_parking_gives_500", "rounds_before_jacking_rent",
+                 "max_turns", "stall_rounds")
+
+    def __init__(self, num_players, properties_auctioned, free_parking_gives_500, rounds_before_jacking_rent,
+                 max_turns=None, stall_rounds=None):
+        self.num_players = num_players
+        self.properties_auctioned = properties_auctioned
+        self.free_parking_gives_500 = free_parking_gives_500
+        self.rounds_before_jacking_rent = rounds_before_jacking_rent
+        self.max_turns = max_turns
+        self.stall_rounds = stall_rounds
+
+    # a copy of these rules with some of them changed, e.g. ruleset.changed(free_parking_gives_500=True)
+    def changed(self, **changes):
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return Ruleset(**values)
+
+    # set up a fresh game with these rules, an InstrumentedGame if we want its counters
+    def make_game(self, seed=None, instrument=False):
+        game_class = InstrumentedGame if instrument else Game
+        return game_class(self.num_players, self.properties_auctioned, self.free_parking_gives_500,
+                          self.rounds_before_jacking_rent, seed, max_turns=self.max_turns,
+                          stall_rounds=self.stall_rounds)
 
 # keeps track of type of space, cost to purchase, and base rent
 # name field isn't used, it just helped us keep track of what Space is which
-# also tracks current owner, and if the Space was ever purchased
+# Spaces never change - who owns a space and if it was ever purchased are kept by each Game
 class Space:
+    __slots__ = ("kind", "name", "cost", "rent", "colour")
+
     def __init__(self, kind, name, cost, rent, colour):
         self.kind = kind
         self.name = name
         self.cost = cost
         self.rent = rent
         self.colour = colour
-        self.owned_by = None
-        self.ever_bought = False
 
 # Keeps track of available money, current space Player is on,
 # and if they are still in the game, and jail sentence in turns
+# also keeps the squares the player owns and how many they own in each group
 class Player:
-    def __init__(self):
+    __slots__ = ("index", "money", "space", "eliminated", "sentence", "holdings", "group_counts")
+
+    def __init__(self, index, num_groups):
+        self.index = index
+        self.holdings = set()
+        self.group_counts = [0] * num_groups
+        self.reset()
+
+    # put the player back at the start, with no money spent and nothing owned
+    def reset(self):
         self.money = 1500
         self.space = 0
         self.eliminated = False
         self.sentence = 0
+        self.holdings.clear()
+        for group in range(len(self.group_counts)):
+            self.group_counts[group] = 0
 
 # class that contains all the data and methods necessary to run one game of Monopoly
 class Game:
-    def __init__(self, num_players, properties_auctioned, free_parking_gives_500, rounds_before_jacking_rent):
-        # list of players is by default empty, it is the turn of the 0th player, and no turns
-        # have passed at the beginning of the game, no trips have been made around the board
-        # rent level determines which rent we charge for properties
+    def __init__(self, num_players, properties_auctioned, free_parking_gives_500, rounds_before_jacking_rent, seed=None, debug=False,
+                 max_turns=None, stall_rounds=None):
+        self.rounds_before_jacking_rent = rounds_before_jacking_rent 
+
+        # turn budget, and how many rounds without an elimination count as a stalled game
+        # a game that hits either is stopped without a winner and marked as censored
+        self.max_turns = max_turns
+        self.stall_rounds = stall_rounds
+
+        # every game shares the same static board table, only ownership is per game
+        # owner holds the index of the player that owns each square, -1 if nobody does
+        self.board = BOARD
+        self.owner = [-1] * BOARD.size
+        self.ever_bought = [False] * BOARD.size
+
+        # in debug mode the running counts are checked against a full recount after every turn
+        self.debug = debug
+
+        # all dice rolls and auction picks in this game come from one seedable stream,
+        # a whole turn of dice at a time
+        self.dice = TurnDice(seed)
+
+        # add players up to the specified amount
         self.players = []
+        for i in range (num_players):
+            new_player = Player(i, len(BOARD.group_members))
+            self.players.append(new_player)
+
+        # set optional rules
+        self.properties_auctioned = properties_auctioned
+        self.free_parking_gives_500 = free_parking_gives_500
+
+        self.clear()
+
+    # put the board, the players and all counts back to the start of a game
+    def clear(self):
+        # it is the turn of the 0th player, and no turns have passed at the beginning of the game,
+        # no trips have been made around the board
+        # rent level determines which rent we charge for properties
         self.curr_turn = 0
         self.num_turns_passed = 0
         self.num_trips_around = 0
         self.rent_level = 0
-        self.rounds_before_jacking_rent = rounds_before_jacking_rent 
 
         # -1 is a dummy value for the winner and turn  and trip around which last property was
         # purchased for the first time,  which is undertermined at start of game
         self.turn_last_property_bought = -1
         self.trip_last_property_bought = -1
         self.winner = -1
-        
-        # set up fresh board
-        self.board = makeNewBoard()
 
-        # add players up to the specified amount
-        for i in range (num_players):
-            new_player = Player()
-            self.players.append(new_player)
-
-        # set optional rules
-        self.properties_auctioned = properties_auctioned
-        self.free_parking_gives_500 = free_parking_gives_500
+        # no turn budget or stall has cut the game off yet
+        self.censored = False
+        self.last_elimination_turn = 0
+        self.update_turn_limit()
+
+        for square in range(self.board.size):
+            self.owner[square] = -1
+            self.ever_bought[square] = False
+        for player in self.players:
+            player.reset()
+        self.link_active_players()
+
+        # running counts so we don't have to rescan the board or the players
+        self.num_unbought = len(self.board.ownable_squares)
+        self.num_eliminated = 0
+
+    # the players still in the game, in turn order, and for every player the next player after them
+    # that is still in the game (for an eliminated player, the next one when they went out), so turns
+    # can go straight from one player still in the game to the next
+    # with nobody left in the game, every player points to themselves
+    def link_active_players(self):
+        num_players = len(self.players)
+        self.active_players = [player for player in self.players if not player.eliminated]
+        self.next_active = list(range(num_players))
+        if len(self.active_players) > 0:
+            following = self.active_players[0].index
+            for index in reversed(range(num_players)):
+                self.next_active[index] = following
+                if not self.players[index].eliminated:
+                    following = index
+
+    # the turn the game will be cut off at, the turn budget or stall_rounds rounds after the
+    # last elimination, whichever comes first
+    def update_turn_limit(self):
+        self.turn_limit = float("inf")
+        if self.max_turns is not None:
+            self.turn_limit = self.max_turns
+        if self.stall_rounds is not None:
+            self.turn_limit = min(self.turn_limit, self.last_elimination_turn + self.stall_rounds * len(self.players))
+
+    # play a single turn, handy for stepping through a replayed game
+    def step(self):
+        return self.run(self.num_turns_passed + 1)
+
+    # the rules this game is being played with
+    def ruleset(self):
+        return Ruleset(len(self.players), self.properties_auctioned, self.free_parking_gives_500,
+                       self.rounds_before_jacking_rent, self.max_turns, self.stall_rounds)
+
+    # a GameSnapshot of the game as it is now
+    def snapshot(self):
+        counts = (self.curr_turn, self.num_turns_passed, self.num_trips_around, self.rent_level,
+                  self.turn_last_property_bought, self.trip_last_property_bought, self.winner,
+                  self.censored, self.last_elimination_turn, self.num_unbought, self.num_eliminated)
+        players = self.players
+        return GameSnapshot(self.ruleset(), counts,
+                            np.array([player.money for player in players], dtype=np.int64),
+                            np.array([player.space for player in players], dtype=np.int8),
+                            np.array([player.sentence for player in players], dtype=np.int8),
+                            np.array([player.eliminated for player in players], dtype=bool),
+                            np.array(self.owner, dtype=np.int16),
+                            np.array(self.ever_bought, dtype=bool),
+                            self.dice.get_state())
+
+    # put the game back to the state in a snapshot, carrying on with the same dice
+    # the game keeps its own rules, so a snapshot can be restored into a game with different ones,
+    # as long as it has the same number of players
+    def restore(self, snapshot):
+        if len(snapshot.money) != len(self.players):
+            raise ValueError("snapshot has " + str(len(snapshot.money)) + " players, the game has " + str(len(self.players)))
+
+        # a snapshot of a replayed game carries on with the rest of its trace, any other with a dice stream
+        if isinstance(snapshot.dice_state, ReplayState):
+            if not isinstance(self.dice, ReplayDice):
+                self.dice = ReplayDice([], [])
+        elif isinstance(self.dice, ReplayDice):
+            self.dice = TurnDice()
+        self.dice.set_state(snapshot.dice_state)
+
+        (self.curr_turn, self.num_turns_passed, self.num_trips_around, self.rent_level,
+         self.turn_last_property_bought, self.trip_last_property_bought, self.winner,
+         self.censored, self.last_elimination_turn, self.num_unbought, self.num_eliminated) = snapshot.counts
+        self.update_turn_limit()
+
+        for player, money, space, sentence, eliminated in zip(self.players, snapshot.money.tolist(), snapshot.space.tolist(),
+                                                              snapshot.sentence.tolist(), snapshot.eliminated.tolist()):
+            player.reset()
+            player.money = money
+            player.space = space
+            player.sentence = sentence
+            player.eliminated = eliminated
+
+        self.link_active_players()
+
+        self.ever_bought[:] = snapshot.ever_bought.tolist()
+        for square in range(self.board.size):
+            self.owner[square] = -1
+        for square, owner in enumerate(snapshot.owner.tolist()):
+            if owner != -1:
+                self.set_owner(square, self.players[owner])
+
+
+    # get this game ready to be played again from the start with a new seed,
+    # reusing everything already allocated for it
+    def reset(self, seed=None):
+        self.dice.reseed(seed)
+        self.clear()
 
     # play throught the game
-    def run(self):
+    # until_turn pauses the game once that many turns have passed, calling run again carries on
+    # (unlike the max_turns the game was made with, which ends the game there as censored)
+    def run(self, until_turn=None):
+        if until_turn is None:
+            until_turn = float("inf")
 
-        # continue as long as we have no winner declared
-        while(self.winner == -1):
+        # continue as long as we have no winner declared, and the game hasn't hit its turn limit
+        while(self.winner == -1 and self.num_turns_passed < self.turn_limit and self.num_turns_passed < until_turn):
 
-            # bump up rent tier if enough rounds have passed for each player
-            if (self.num_turns_passed >= self.rounds_before_jacking_rent and self.num_turns_passed % (len(self.players) * self.rounds_before_jacking_rent)  == 0 and self.rent_level < 5):
-                self.rent_level += 1
-                
             curr_player = self.players[self.curr_turn]
 
-            # only interested if the player whose turn it is is still in the game
-            if (curr_player.eliminated == False):
+            # eliminated players don't play, so go straight on to the next player still in the game,
+            # passing the turns in between all at once
+            if curr_player.eliminated:
+                self.pass_eliminated_turns(until_turn)
+                if self.debug:
+                    self.check_counters()
+                continue
 
-                # if they still have turns in Jail
-                if curr_player.sentence > 0:
-
-                    # if they can pay the fine right away, they pay it and get out of jail
-                    if (curr_player.money > 50):
-                        curr_player.money -= 50
-                        curr_player.sentence = 0
+            # bump up rent tier if enough rounds have passed for each player
+            if (self.num_turns_passed >= self.rounds_before_jacking_rent and self.num_turns_passed % (len(self.players) * self.rounds_before_jacking_rent)  == 0 and self.rent_level < 5):
+                self.rent_level += 1
 
-                    else:
-                        # decrease the turns remaining in Jail by 1
-                        curr_player.sentence -= 1
-
-                    # if they have served their sentence
-                    if curr_player.sentence == 0:
-
-                        # the player pays the 50 dollar fine, is eliminated if they cannot pay
-                        curr_player.money -= 50
-                        if curr_player.money < 0:
-                            self.eliminate (curr_player, "bank")
-        
-                # roll your first pair of dice
-                doubles, roll_total = rollTwoDice()
-
-                # if you rolled doubles you can immediately leave jail without servign sentence
-                if doubles:
-                    curr_player.sentence = 0
-
-                # can move, but only if no sentence in Jail
-                if curr_player.sentence == 0:
+            # if they still have turns in Jail
+            if curr_player.sentence > 0:
+                self.serve_jail_time(curr_player)
+    
+            # roll every pair of dice for the turn at once: whether the first was doubles, the totals to
+            # move by (another roll follows each doubles), and the total of a third doubles in a row, if any
+            doubles, roll_totals, jail_roll = self.dice.roll_turn()
+
+            # if you rolled doubles you can immediately leave jail without servign sentence
+            if doubles and curr_player.sentence > 0:
+                self.leave_jail_on_doubles(curr_player)
+
+            # can move, but only if no sentence in Jail
+            # moves happen one after another, even if an earlier one landed the player in jail
+            if curr_player.sentence == 0:
+                for roll_total in roll_totals:
                     self.move_player(curr_player, roll_total)
 
-                    # if your first roll was doubles you can roll again
-                    if doubles:
-                        doubles,roll_total = rollTwoDice()
-                        self.move_player(curr_player, roll_total)
-
-                        # if your second roll was doubles, you can roll a third time
-                        if doubles:
-                            doubles,roll_total = rollTwoDice()
+                # third doubles in a row - go to jail
+                if jail_roll:
+                    self.go_to_jail(curr_player)
 
-                            # third doubles in a row - go to jail
-                            if doubles:
-                                self.go_to_jail(curr_player)
-
-                            # otherwise move normally
-                            else:
-                                self.move_player(curr_player, roll_total)          
+            if self.debug:
+                self.check_counters()
 
             # go to next turn
             self.num_turns_passed += 1
             self.curr_turn = (self.curr_turn + 1) % len(self.players)
 
+        # no winner by the turn limit - the game ran over its budget or stalled
+        if self.winner == -1 and self.num_turns_passed >= self.turn_limit:
+            self.censored = True
+
         # game ended, return stats
         return self.winner, self.num_turns_passed, self.turn_last_property_bought, self.num_trips_around, self.trip_last_property_bought
 
+    # pass the turns of the eliminated players from the current one up to the next player still in the game,
+    # stopping early at the turn limit or until_turn
+    # every passed turn counts towards num_turns_passed, and rent goes up on any of them it would have
+    # on a turn that was played: on every multiple of a whole number of rent rounds
+    def pass_eliminated_turns(self, until_turn):
+        num_players = len(self.players)
+        next_player = self.next_active[self.curr_turn]
+        while self.players[next_player].eliminated and next_player != self.curr_turn:
+            next_player = self.next_active[next_player]
+        num_turns = (next_player - self.curr_turn) % num_players or num_players
+        num_turns = int(min(num_turns, self.turn_limit - self.num_turns_passed, until_turn - self.num_turns_passed))
+
+        rent_period = num_players * self.rounds_before_jacking_rent
+        first_turn = max(self.num_turns_passed, self.rounds_before_jacking_rent, 1)
+        last_turn = self.num_turns_passed + num_turns - 1
+        if last_turn >= first_turn:
+            rises = last_turn // rent_period - (first_turn - 1) // rent_period
+            self.rent_level = min(5, self.rent_level + rises)
+
+        self.num_turns_passed += num_turns
+        self.curr_turn = (self.curr_turn + num_turns) % num_players
+
+    # collect the stats of this game once it has been run
+    def stats(self):
+        return Stats(self.winner, self.num_turns_passed, self.turn_last_property_bought, self.num_trips_around, self.trip_last_property_bought,
+                     self.censored)
+
     # player is removed from game, additional parameter 'owing_who'
     # says if the creditor they lost to is the Bank or another player
     def eliminate(self, player, owing_who):
+        # count how many players in the game were eliminated
+        # the game isn't stalled while players keep getting eliminated
+        if not player.eliminated:
+            self.num_eliminated += 1
+            if self.stall_rounds is not None:
+                self.last_elimination_turn = self.num_turns_passed
+                self.update_turn_limit()
+
+            # take them out of the players still in the game, the player before them now goes straight to the one after
+            position = self.active_players.index(player)
+            self.active_players.pop(position)
+            if len(self.active_players) > 0:
+                self.next_active[self.active_players[position - 1].index] = self.next_active[player.index]
         player.eliminated = True
         player.money = 0
 
-        # count how many players in the game were eliminated
-        how_many_eliminated = 0
-        for i in range(len(self.players)):
-            if self.players[i].eliminated:
-                how_many_eliminated += 1
-
         # if all but one player was eliminated, that player is the winner
-        if how_many_eliminated >= (len(self.players) - 1):
-            for i in range(len(self.players)):
-                if not self.players[i].eliminated:
-                    self.winner = i
+        if self.num_eliminated >= (len(self.players) - 1):
+            if len(self.active_players) > 0:
+                self.winner = self.active_players[-1].index
 
         # otherwise if the game is still going, handle the
         # distribution of the eliminated player's assets 
         else:
+            # go through their squares in board order, so auctions happen in the same order as a board scan
+            holdings = sorted(player.holdings)
+
             # if they owed the bank, release their properties and auction them off
             if owing_who == "bank":
-                for i in range (len(self.board)):
-                    if self.board[i].owned_by == player:
-                        self.board[i].owned_by = None
-                        self.auction(self.board[i])
+                for square in holdings:
+                    self.set_owner(square, None)
+                    self.auction(square)
 
             # if they were eliminated because they could not pay another player
             # give that player all of their properties
             else:
-                for i in range (len(self.board)):
-                    if self.board[i].owned_by == player:
-                        self.board[i].owned_by = owing_who
+                for square in holdings:
+                    self.set_owner(square, owing_who)
             
+    # change who owns a square, keeping the holdings and group counts of both players up to date
+    # new_owner is a Player, or None if the square goes back to the bank
+    def set_owner(self, square, new_owner):
+        group = self.board.groups[square]
+        if self.owner[square] != -1:
+            old_owner = self.players[self.owner[square]]
+            old_owner.holdings.remove(square)
+            old_owner.group_counts[group] -= 1
+
+        if new_owner is None:
+            self.owner[square] = -1
+        else:
+            self.owner[square] = new_owner.index
+            new_owner.holdings.add(square)
+            new_owner.group_counts[group] += 1
+
     # count how many railroads are owned by a given player
     def railroads_owned(self, player):
-        count = 0
-
-        # Reading Railroad
-        if self.board[5].owned_by == player:
-            count += 1
-
-        # Pennsylvania Railroad
-        if self.board[15].owned_by == player:
-            count += 1
-
-        # B&O Railroad
-        if self.board[25].owned_by == player:
-            count += 1
-
-        # Short Line
-        if self.board[35].owned_by == player:
-            count += 1
-            
-        return count
+        return player.group_counts[self.board.railroad_group]
 
     # count how many utilities are owned by a given player
     def utilities_owned(self, player):
-        count = 0
-
-        # Electric Company
-        if self.board[12].owned_by == player:
-            count +=1
-
-        # Water Works
-        if self.board[28].owned_by == player:
-            count +=1
-            
-        return count
+        return player.group_counts[self.board.utility_group]
 
     # given a total from a dice roll, move the player that rolled it
     def move_player(self, player, roll_total):
@@ -258,55 +543,57 @@ class Game:
         # handle landing on the space you've move to
         self.land(player)
 
-    # determine if all spaces sharing a colour with a given space are owned by the same player
-    def colour_monopoly(self, space):
-        owner = space.owned_by
-        for i in range (len(self.board)):
-            if self.board[i].colour == space.colour and self.board[i].owned_by != owner:
-                return False
-        return True
+    # determine if all squares sharing a colour with a given square are owned by the same player
+    def colour_monopoly(self, square):
+        group = self.board.groups[square]
+        return self.players[self.owner[square]].group_counts[group] == len(self.board.group_members[group])
+
+    # a given player pays rent at a specific square
+    def player_pays_rent(self, player, square):
+        owner = self.players[self.owner[square]]
+        kind = self.board.kinds[square]
 
-    # a given player pays rent at a specific space
-    def player_pays_rent(self, player, space):
         # initialize a payment amount before calculating it
         payment = 0
 
         # for properties, the amount to be paid is the rent
         # unless the owning player owns all of the same colour, then then can charge twice the rent
-        if space.kind == "property":
-            if self.colour_monopoly(space):
-                payment = 2 * space.rent[self.rent_level]
+        if kind == KIND_PROPERTY:
+            if self.colour_monopoly(square):
+                payment = 2 * self.board.rents[square][self.rent_level]
             else:
-                payment = space.rent[self.rent_level]
+                payment = self.board.rents[square][self.rent_level]
 
         # for railroads, the amount to be paid depends on how many railroads the owner owns
         # 25 for 1, 50 for 2, 100 for 3, 200 for 4
-        elif space.kind == "railroad":
-            payment = 25 * (2**(self.railroads_owned(space.owned_by) - 1))
+        elif kind == KIND_RAILROAD:
+            payment = 25 * (2**(self.railroads_owned(owner) - 1))
 
         # for utilities, the amount to be paid depends on how many utilities the owner owns
         # 4 times a dice roll if one, 10 times a dice roll if both
-        elif space.kind == "utility":
-            if self.utilities_owned(space.owned_by) == 1:
-                payment = rollDice() * 4
-            elif self.utilities_owned(space.owned_by) == 2:
-                payment = rollDice() * 10
+        elif kind == KIND_UTILITY:
+            if self.utilities_owned(owner) == 1:
+                payment = self.dice.roll() * 4
+            elif self.utilities_owned(owner) == 2:
+                payment = self.dice.roll() * 10
 
-        # if the player can pay the rent they give the money to the owner of the space
+        # if the player can pay the rent they give the money to the owner of the square
         if player.money > payment:
             player.money -= payment
-            space.owned_by.money += payment
+            owner.money += payment
 
         # if they can't, they give what they can, and the player is eliminated
         else:
-            space.owned_by.money += player.money
-            self.eliminate(player, space.owned_by)
+            owner.money += player.money
+            self.eliminate(player, owner)
 
     # purchasing a property
-    def player_buys_property(self, player, space):
-        player.money -= space.cost
-        space.owned_by = player
-        space.ever_bought = True
+    def player_buys_property(self, player, square):
+        player.money -= self.board.costs[square]
+        self.set_owner(square, player)
+        if not self.ever_bought[square]:
+            self.ever_bought[square] = True
+            self.num_unbought -= 1
 
         # if we have not yet found the turn where the last property was bought for the first time,
         # and this was the last unbought property, this was that turn
@@ -315,82 +602,524 @@ class Game:
             self.trip_last_property_bought = self.num_trips_around
             
 
+    # a player with turns left in Jail starts their turn
+    def serve_jail_time(self, player):
+        # if they can pay the fine right away, they pay it and get out of jail
+        if (player.money > 50):
+            player.money -= 50
+            player.sentence = 0
+
+        else:
+            # decrease the turns remaining in Jail by 1
+            player.sentence -= 1
+
+        # if they have served their sentence
+        if player.sentence == 0:
+
+            # the player pays the 50 dollar fine, is eliminated if they cannot pay
+            player.money -= 50
+            if player.money < 0:
+                self.eliminate (player, "bank")
+
+    # a player in Jail rolled doubles, they leave without serving the rest of their sentence
+    def leave_jail_on_doubles(self, player):
+        player.sentence = 0
+
     # send a player to the Jail space with a 3 turn sentence
     def go_to_jail(self, player):
             player.space = 10
             player.sentence = 3
 
-    # auction a given space
-    def auction(self, space):
-        # make a list of players that can afford the space
-        players_who_can_afford = []
-        for i in range (len(self.players)):
-            if self.players[i].eliminated == False and self.players[i].money > space.cost:
-                players_who_can_afford.append(self.players[i])
+    # auction a given square
+    def auction(self, square):
+        cost = self.board.costs[square]
+
+        # make a list of players still in the game that can afford the square
+        players_who_can_afford = [player for player in self.active_players if player.money > cost]
 
         # if there is at least onem pick one randomly and they buy it
         if len(players_who_can_afford) > 0:
-            sell_to = np.random.randint(0,len(players_who_can_afford))
-            self.player_buys_property(players_who_can_afford[sell_to], space)
+            sell_to = self.dice.pick(len(players_who_can_afford))
+            self.player_buys_property(players_who_can_afford[sell_to], square)
 
-    # handles what happens when the player lands on each kind of space
+    # handles what happens when the player lands on each kind of square
     def land(self, player):
-        space = self.board[player.space]
+        square = player.space
+        kind = self.board.kinds[square]
 
         # landed on "Free Parking" - give 500 if optional rule on
-        if (space.kind == "parking" and self.free_parking_gives_500):
+        if (kind == KIND_PARKING and self.free_parking_gives_500):
             player.money += 500
 
-        # landed on either "Tax" space - eliminate player if they can't pay
-        elif (space.kind == "tax"):
-            if player.money > space.cost:
-                player.money -= space.cost
+        # landed on either "Tax" square - eliminate player if they can't pay
+        elif (kind == KIND_TAX):
+            if player.money > self.board.costs[square]:
+                player.money -= self.board.costs[square]
             else:
                 self.eliminate(player, "bank")
 
         # landed on "Go to Jail"
-        elif (space.kind == "goto"):
+        elif (kind == KIND_GOTO):
             self.go_to_jail(player)
 
-        # landed on an unowned property
-        elif (space.owned_by == None and (space.kind == "property" or space.kind == "utility" or space.kind == "railroad")):
+        # landed on an unowned property, utility or railroad
+        elif (self.owner[square] == -1 and self.board.ownable[square]):
 
             # can afford to buy without hitting 0 dollars
-            if player.money > space.cost:
-                self.player_buys_property(player, space)
+            if player.money > self.board.costs[square]:
+                self.player_buys_property(player, square)
 
             # if property auctioning rule on, auction it
             elif self.properties_auctioned:
-                self.auction(space)
+                self.auction(square)
 
-        # if landed on owned space that is not owned but the player - player pays rent to owner
-        elif (space.owned_by != None and space.owned_by != player):
-            self.player_pays_rent(player, space)
+        # if landed on owned square that is not owned but the player - player pays rent to owner
+        elif (self.owner[square] != -1 and self.owner[square] != player.index):
+            self.player_pays_rent(player, square)
 
     # checks if all properties have been bought at least once
     #utilities and  railroads are ownable properties, but have another type
     def all_props_owned(self):
-        for i in range (len(self.board)):
-            if (self.board[i].kind == "property" or self.board[i].kind == "railroad" or
-               self.board[i].kind == "utility") and self.board[i].ever_bought == False:
-                   return False
-        return True
+        return self.num_unbought == 0
+
+    # recount everything the game keeps running counts of, and make sure they match
+    def check_counters(self):
+        unbought = 0
+        for square in self.board.ownable_squares:
+            if self.ever_bought[square] == False:
+                unbought += 1
+        if unbought != self.num_unbought:
+            raise RuntimeError("unbought count is " + str(self.num_unbought) + ", recount gives " + str(unbought))
+
+        eliminated = 0
+        for player in self.players:
+            if player.eliminated:
+                eliminated += 1
+        if eliminated != self.num_eliminated:
+            raise RuntimeError("eliminated count is " + str(self.num_eliminated) + ", recount gives " + str(eliminated))
+
+        active = [player for player in self.players if not player.eliminated]
+        if active != self.active_players:
+            raise RuntimeError("players still in the game don't match the eliminated flags")
+        for position, player in enumerate(active):
+            if self.next_active[player.index] != active[(position + 1) % len(active)].index:
+                raise RuntimeError("player " + str(player.index) + " doesn't go on to the next player still in the game")
+
+        for player in self.players:
+            holdings = set()
+            group_counts = [0] * len(self.board.group_members)
+            for square in range(self.board.size):
+                if self.owner[square] == player.index:
+                    holdings.add(square)
+                    group_counts[self.board.groups[square]] += 1
+            if holdings != player.holdings or group_counts != player.group_counts:
+                raise RuntimeError("holdings of player " + str(player.index) + " don't match the board")
    
-# roll a single dice 1 to 6
-def rollDice():
-    return np.random.randint(1,7)
-
-# roll two 6-sided die  and return whether or not they were doubles, and the total
-def rollTwoDice():
-    doubles = False
-    roll1 = rollDice()
-    roll2 = rollDice()
-    if roll1 == roll2:
-        doubles = True
-    return doubles, (roll1 + roll2)
+# names of the single-number counters kept by GameCounters, in the order they are stored
+GAME_EVENTS = ("auctions", "auctions_unsold", "jail_entries", "jail_exits_fine", "jail_exits_doubles",
+               "jail_exits_served", "go_passes", "eliminated_by_bank", "eliminated_by_player")
+
+# counts of what happened during one or more games, in arrays allocated once per game
+# landings and rent paid per square, rent paid at each rent level, and the GAME_EVENTS counts
+class GameCounters:
+    __slots__ = ("landings", "rent_paid", "rent_paid_by_level", "events")
+
+    def __init__(self):
+        self.landings = np.zeros(BOARD.size, dtype=np.int64)
+        self.rent_paid = np.zeros(BOARD.size, dtype=np.int64)
+        self.rent_paid_by_level = np.zeros(len(BOARD.rents[0]), dtype=np.int64)
+        self.events = np.zeros(len(GAME_EVENTS), dtype=np.int64)
+
+    # add the counts from another set of counters to these
+    def merge(self, other):
+        self.landings += other.landings
+        self.rent_paid += other.rent_paid
+        self.rent_paid_by_level += other.rent_paid_by_level
+        self.events += other.events
+
+    # the GAME_EVENTS counts by name
+    def event_counts(self):
+        return dict(zip(GAME_EVENTS, self.events.tolist()))
+
+def copy_counters(counters):
+    copy = GameCounters()
+    copy.merge(counters)
+    return copy
+
+# add up the counters of every instrumented game in a list of Stats
+def aggregate_counters(stats_list):
+    total = GameCounters()
+    for stats in stats_list:
+        if stats.counters is not None:
+            total.merge(stats.counters)
+    return total
+
+# a Game that counts what happens in it as it is played
+# the counting lives in overrides of the Game methods, so a plain Game doesn't pay anything for it
+class InstrumentedGame(Game):
+    # every game gets its own counters, so stats handed out earlier keep theirs after a reset
+    def clear(self):
+        super().clear()
+        self.counters = GameCounters()
+
+    def stats(self):
+        stats = super().stats()
+        stats.counters = self.counters
+        return stats
+
+    # snapshots of an instrumented game carry a copy of its counters
+    def snapshot(self):
+        snapshot = super().snapshot()
+        snapshot.counters = copy_counters(self.counters)
+        return snapshot
+
+    def restore(self, snapshot):
+        super().restore(snapshot)
+        self.counters = GameCounters() if snapshot.counters is None else copy_counters(snapshot.counters)
+
+    def land(self, player):
+        self.counters.landings[player.space] += 1
+        super().land(player)
+
+    def move_player(self, player, roll_total):
+        trips_before = self.num_trips_around
+        super().move_player(player, roll_total)
+        self.counters.events[GO_PASSES] += self.num_trips_around - trips_before
+
+    def player_pays_rent(self, player, square):
+        owner = self.players[self.owner[square]]
+        money_before = owner.money
+        super().player_pays_rent(player, square)
+        paid = owner.money - money_before
+        self.counters.rent_paid[square] += paid
+        self.counters.rent_paid_by_level[self.rent_level] += paid
+
+    def auction(self, square):
+        super().auction(square)
+        self.counters.events[AUCTIONS] += 1
+        if self.owner[square] == -1:
+            self.counters.events[AUCTIONS_UNSOLD] += 1
+
+    def go_to_jail(self, player):
+        self.counters.events[JAIL_ENTRIES] += 1
+        super().go_to_jail(player)
+
+    def serve_jail_time(self, player):
+        pays_fine = player.money > 50
+        super().serve_jail_time(player)
+        if pays_fine:
+            self.counters.events[JAIL_EXITS_FINE] += 1
+        elif player.sentence == 0:
+            self.counters.events[JAIL_EXITS_SERVED] += 1
+
+    def leave_jail_on_doubles(self, player):
+        self.counters.events[JAIL_EXITS_DOUBLES] += 1
+        super().leave_jail_on_doubles(player)
+
+    def eliminate(self, player, owing_who):
+        if not player.eliminated:
+            if owing_who == "bank":
+                self.counters.events[ELIMINATED_BY_BANK] += 1
+            else:
+                self.counters.events[ELIMINATED_BY_PLAYER] += 1
+        super().eliminate(player, owing_who)
+
+# indices into GameCounters.events
+(AUCTIONS, AUCTIONS_UNSOLD, JAIL_ENTRIES, JAIL_EXITS_FINE, JAIL_EXITS_DOUBLES,
+ JAIL_EXITS_SERVED, GO_PASSES, ELIMINATED_BY_BANK, ELIMINATED_BY_PLAYER) = range(len(GAME_EVENTS))
+
+# the index-th child of a SeedSequence, the same one seed.spawn would hand out,
+# but without changing the state of the parent so it can be asked for again
+def child_seed(seed, index):
+    return np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (index,), pool_size=seed.pool_size)
+
+# source of all the randomness in one game - dice rolls and auction picks
+# dice are drawn from the generator a block at a time and handed out one by one,
+# which is far cheaper than asking NumPy for every single die
+# auction picks come from their own generator, so the dice sequence doesn't
+# depend on how many auctions happened
+class DiceStream:
+    __slots__ = ("rng", "auction_rng", "block_size", "rolls", "next_roll", "block_state")
+
+    def __init__(self, seed=None, block_size=4096):
+        self.block_size = block_size
+        self.reseed(seed)
+
+    # start the stream over from a new seed, throwing away any rolls left over
+    def reseed(self, seed=None):
+        # seed can be anything np.random.SeedSequence takes, or a SeedSequence itself
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(child_seed(seed, 0))
+        self.auction_rng = np.random.default_rng(child_seed(seed, 1))
+
+        # rolls waiting to be handed out, and the index of the next one
+        self.rolls = []
+        self.next_roll = 0
+
+    # draw a new block of rolls, remembering the state of the generator before it was drawn
+    def refill(self):
+        self.block_state = self.rng.bit_generator.state
+        self.rolls = self.rng.integers(1, 7, size=self.block_size).tolist()
+        self.next_roll = 0
+
+    # roll a single dice 1 to 6
+    def roll(self):
+        if self.next_roll >= len(self.rolls):
+            self.refill()
+        value = self.rolls[self.next_roll]
+        self.next_roll += 1
+        return value
+
+    # roll two 6-sided die and return whether or not they were doubles, and the total
+    def roll_two(self):
+        # a leftover single roll at the end of a block is skipped
+        if self.next_roll + 2 > len(self.rolls):
+            self.refill()
+        roll1 = self.rolls[self.next_roll]
+        roll2 = self.rolls[self.next_roll + 1]
+        self.next_roll += 2
+        return roll1 == roll2, roll1 + roll2
+
+    # roll the dice for a whole turn a pair at a time, see TurnTable for what comes back
+    def roll_turn(self):
+        doubles, first_total = self.roll_two()
+        if not doubles:
+            return False, (first_total,), 0
+        doubles, second_total = self.roll_two()
+        if not doubles:
+            return True, (first_total, second_total), 0
+        doubles, third_total = self.roll_two()
+        if doubles:
+            return True, (first_total, second_total), third_total
+        return True, (first_total, second_total, third_total), 0
+
+    # pick one of a number of choices uniformly at random, used for auctions
+    def pick(self, num_choices):
+        return int(self.auction_rng.integers(0, num_choices))
+
+    # everything needed to carry on the stream from where it is: the state of the auction generator,
+    # and the state of the dice generator before the current block of rolls with how far into it we are,
+    # so the block can be drawn again rather than stored
+    def get_state(self):
+        if len(self.rolls) == 0:
+            return (self.rng.bit_generator.state, False, 0, self.auction_rng.bit_generator.state)
+        return (self.block_state, True, self.next_roll, self.auction_rng.bit_generator.state)
+
+    def set_state(self, state):
+        dice_state, in_block, next_roll, auction_state = state
+        self.rng.bit_generator.state = dice_state
+        self.auction_rng.bit_generator.state = auction_state
+        self.rolls = []
+        self.next_roll = 0
+        if in_block:
+            self.refill()
+            self.next_roll = next_roll
+
+# every way a turn's dice can go, up to three pairs of dice rolled as six dice in one go
+# a turn is coded as a number below 6**6, with each pair of dice as a digit in base 36 (the
+# first pair lowest), so every sequence of six dice is equally likely and one draw settles the turn
+# the outcome of a turn is the tuple (first pair was doubles, totals to move by, total of a third doubles or 0):
+# a pair that isn't doubles ends the turn, and a third doubles in a row sends the player to jail instead of moving
+# only the pairs the turn actually rolls matter, so codes that agree on those share one outcome
+TURN_CODES = 6**6
+
+class TurnTable:
+    def __init__(self):
+        pair_totals = [pair % 6 + pair // 6 + 2 for pair in range(36)]
+        pair_doubles = [pair % 6 == pair // 6 for pair in range(36)]
+
+        # codes[third pair, second pair, first pair] holds the index of the outcome of that code
+        self.outcomes = []
+        outcome_indexes = {}
+        codes = np.zeros((36, 36, 36), dtype=np.int32)
+
+        def add(outcome):
+            if outcome not in outcome_indexes:
+                outcome_indexes[outcome] = len(self.outcomes)
+                self.outcomes.append(outcome)
+            return outcome_indexes[outcome]
+
+        for first in range(36):
+            if not pair_doubles[first]:
+                codes[:, :, first] = add((False, (pair_totals[first],), 0))
+                continue
+            for second in range(36):
+                if not pair_doubles[second]:
+                    codes[:, second, first] = add((True, (pair_totals[first], pair_totals[second]), 0))
+                    continue
+                for third in range(36):
+                    if pair_doubles[third]:
+                        outcome = (True, (pair_totals[first], pair_totals[second]), pair_totals[third])
+                    else:
+                        outcome = (True, (pair_totals[first], pair_totals[second], pair_totals[third]), 0)
+                    codes[third, second, first] = add(outcome)
+
+        # chance of each outcome, and the outcome of every code, in code order
+        # by_code holds the outcome tuples themselves, so a whole block of codes is looked up with one
+        # NumPy index and every turn in it shares those tuples rather than making new objects
+        self.outcome_of_code = codes.ravel()
+        self.probabilities = read_only_array(np.bincount(self.outcome_of_code) / TURN_CODES, np.float64)
+        outcomes = np.empty(len(self.outcomes), dtype=object)
+        outcomes[:] = self.outcomes
+        self.by_code = outcomes[self.outcome_of_code]
+
+# turns per block of TurnDice, most games are reset long before a block the size of DiceStream's is used up
+TURN_BLOCK_SIZE = 256
+
+# a DiceStream that draws whole turns instead of single dice, each turn one code looked up in TURN_TABLE
+# rather than up to three pairs of dice each with its own check for doubles
+# the codes of a block stay a NumPy array, rolls holds the outcome of each as a list, and faces the
+# single dice for utility rent, a code too as 6 divides 6**6 evenly, as a list of small ints
+class TurnDice(DiceStream):
+    __slots__ = ("codes", "faces")
+
+    def __init__(self, seed=None, block_size=TURN_BLOCK_SIZE):
+        super().__init__(seed, block_size)
+
+    def refill(self):
+        self.block_state = self.rng.bit_generator.state
+        self.codes = self.rng.integers(0, TURN_CODES, size=self.block_size)
+        self.rolls = TURN_TABLE.by_code[self.codes].tolist()
+        self.faces = (self.codes % 6 + 1).tolist()
+        self.next_roll = 0
+
+    def roll(self):
+        if self.next_roll >= len(self.rolls):
+            self.refill()
+        value = self.faces[self.next_roll]
+        self.next_roll += 1
+        return value
+
+    # a pair of dice on its own, the first pair of a code
+    def roll_two(self):
+        if self.next_roll >= len(self.rolls):
+            self.refill()
+        code = int(self.codes[self.next_roll])
+        self.next_roll += 1
+        return code % 6 == code // 6 % 6, code % 6 + code // 6 % 6 + 2
+
+    def roll_turn(self):
+        if self.next_roll >= len(self.rolls):
+            self.refill()
+        outcome = self.rolls[self.next_roll]
+        self.next_roll += 1
+        return outcome
+
+# a roll of two dice takes one byte in a trace: the total, plus 16 if it was doubles
+TRACE_DOUBLES = 16
+
+# stands in for a game's DiceStream and writes down everything drawn from it, one byte each:
+# every roll of two dice (see TRACE_DOUBLES), every single dice roll, and every auction pick
+class DiceRecorder:
+    __slots__ = ("dice", "rolls", "picks")
+
+    def __init__(self, dice):
+        self.dice = dice
+        self.rolls = bytearray()
+        self.picks = bytearray()
+
+    def reseed(self, seed=None):
+        self.dice.reseed(seed)
+        self.rolls = bytearray()
+        self.picks = bytearray()
+
+    def roll(self):
+        value = self.dice.roll()
+        self.rolls.append(value)
+        return value
+
+    def roll_two(self):
+        doubles, roll_total = self.dice.roll_two()
+        self.rolls.append(roll_total + TRACE_DOUBLES if doubles else roll_total)
+        return doubles, roll_total
+
+    # a turn is written as its pairs of dice in order, the same bytes as rolling them one pair at a time
+    def roll_turn(self):
+        outcome = self.dice.roll_turn()
+        doubles, roll_totals, jail_roll = outcome
+        for roll_total in roll_totals[:-1]:
+            self.rolls.append(roll_total + TRACE_DOUBLES)
+        self.rolls.append(roll_totals[-1] + TRACE_DOUBLES if jail_roll else roll_totals[-1])
+        if jail_roll:
+            self.rolls.append(jail_roll + TRACE_DOUBLES)
+        return outcome
+
+    # a snapshot of a traced game holds the state of the dice underneath, so it can be restored into any game
+    def get_state(self):
+        return self.dice.get_state()
+
+    # the trace has to be every draw from the start of the game, which it wouldn't be once the game jumped
+    def set_state(self, state):
+        raise ValueError("a traced game can't be restored from a snapshot, its trace would no longer replay")
+
+    def pick(self, num_choices):
+        if num_choices > 256:
+            raise ValueError("auction picks are traced as single bytes, at most 256 players can bid")
+        choice = self.dice.pick(num_choices)
+        self.picks.append(choice)
+        return choice
+
+# stands in for a game's DiceStream and hands back what a DiceRecorder wrote down, in order
+# a pick that doesn't fit the auction means the game has gone differently than when it was traced
+class ReplayDice:
+    __slots__ = ("rolls", "picks", "next_roll", "next_pick")
+
+    def __init__(self, rolls, picks):
+        self.rolls = np.asarray(rolls, dtype=np.uint8).tolist()
+        self.picks = np.asarray(picks, dtype=np.uint8).tolist()
+        self.reseed()
+
+    # a replay always starts over from the start of its trace
+    def reseed(self, seed=None):
+        self.next_roll = 0
+        self.next_pick = 0
+
+    def roll(self):
+        if self.next_roll >= len(self.rolls):
+            raise ValueError("trace ran out of dice before the game ended")
+        value = self.rolls[self.next_roll]
+        self.next_roll += 1
+        return value
+
+    def roll_two(self):
+        if self.next_roll >= len(self.rolls):
+            raise ValueError("trace ran out of dice before the game ended")
+        code = self.rolls[self.next_roll]
+        self.next_roll += 1
+        return code >= TRACE_DOUBLES, code % TRACE_DOUBLES
+
+    # a turn is read back a pair at a time, the same as DiceStream rolls one
+    roll_turn = DiceStream.roll_turn
+
+    def pick(self, num_choices):
+        if self.next_pick >= len(self.picks):
+            raise ValueError("trace ran out of auction picks before the game ended")
+        choice = self.picks[self.next_pick]
+        self.next_pick += 1
+        if choice >= num_choices:
+            raise ValueError("trace doesn't match the game being replayed")
+        return choice
+
+    # the rest of the trace from here on, so a snapshot of a replayed game can carry on without the trace files
+    def get_state(self):
+        return ReplayState(bytes(self.rolls[self.next_roll:]), bytes(self.picks[self.next_pick:]))
+
+    def set_state(self, state):
+        self.rolls = list(state.rolls)
+        self.picks = list(state.picks)
+        self.reseed()
+
+# the dice state of a ReplayDice: what is left of its trace, as bytes
+class ReplayState:
+    __slots__ = ("rolls", "picks")
+
+    def __init__(self, rolls, picks):
+        self.rolls = rolls
+        self.picks = picks
 
 # build a standard US version Monopoly board
-# making the board fresh makes it easier to reset the properties of each Space
+# this is only called once, to build BOARD - Spaces hold no per-game state, so every game shares them
 def makeNewBoard():
 
     med_ave = Space("property","Mediterranean Avenue", 60, [2, 10, 30, 90, 160, 250], "brown")
@@ -452,127 +1181,1122 @@ def makeNewBoard():
     
     return board
 
+# integer codes for each kind of square, so the game compares ints instead of strings
+KIND_GO, KIND_PROPERTY, KIND_RAILROAD, KIND_UTILITY, KIND_TAX, KIND_CHEST, KIND_CHANCE, KIND_JAIL, KIND_PARKING, KIND_GOTO = range(10)
+KIND_CODES = {"go": KIND_GO, "property": KIND_PROPERTY, "railroad": KIND_RAILROAD, "utility": KIND_UTILITY,
+              "tax": KIND_TAX, "chest": KIND_CHEST, "chance": KIND_CHANCE, "jail": KIND_JAIL,
+              "parking": KIND_PARKING, "goto": KIND_GOTO}
+
+# compact, read-only version of a board, shared by every game
+# each square is a row of kind code, cost, rent tiers and group id, kept both as tuples
+# for the per-turn game code and as NumPy arrays for whole-board calculations
+# groups are the colour sets, then the railroads, then the utilities, -1 for anything else
+class BoardTable:
+    def __init__(self, board):
+        self.size = len(board)
+
+        # number the groups in the order they first show up on the board
+        group_names = []
+        for space in board:
+            if space.kind == "property" and space.colour not in group_names:
+                group_names.append(space.colour)
+        self.railroad_group = len(group_names)
+        self.utility_group = len(group_names) + 1
+
+        groups = []
+        for space in board:
+            if space.kind == "property":
+                groups.append(group_names.index(space.colour))
+            elif space.kind == "railroad":
+                groups.append(self.railroad_group)
+            elif space.kind == "utility":
+                groups.append(self.utility_group)
+            else:
+                groups.append(-1)
+
+        # every square has a rent for each of the 6 tiers, squares with only one rent keep it at every tier
+        num_tiers = max(len(space.rent) for space in board)
+        rents = [tuple(space.rent) + (space.rent[-1],) * (num_tiers - len(space.rent)) for space in board]
+
+        self.names = tuple(space.name for space in board)
+        self.kinds = tuple(KIND_CODES[space.kind] for space in board)
+        self.costs = tuple(space.cost for space in board)
+        self.rents = tuple(rents)
+        self.groups = tuple(groups)
+        self.ownable = tuple(kind in (KIND_PROPERTY, KIND_RAILROAD, KIND_UTILITY) for kind in self.kinds)
+        self.ownable_squares = tuple(square for square in range(self.size) if self.ownable[square])
+
+        # the squares in each group, so monopoly checks only touch 2 or 3 squares
+        self.group_members = tuple(tuple(square for square in range(self.size) if groups[square] == group)
+                                   for group in range(self.utility_group + 1))
+
+        self.kind_array = read_only_array(self.kinds, np.int8)
+        self.cost_array = read_only_array(self.costs, np.int64)
+        self.rent_array = read_only_array(self.rents, np.int64)
+        self.group_array = read_only_array(self.groups, np.int8)
+
+# NumPy copy of some values that can't be changed afterwards
+def read_only_array(values, dtype):
+    array = np.array(values, dtype=dtype)
+    array.setflags(write=False)
+    return array
+
+# the standard board every game is played on
+BOARD = BoardTable(makeNewBoard())
+
+# every game draws its turns from the same outcome table, built once on import
+TURN_TABLE = TurnTable()
+
+#####################
+###    RUNNER     ###
+#####################
+
+# how many games a worker process plays per job it is handed
+RUNNER_CHUNK_SIZE = 25
+
+# how many games go in each file of a ResultStore, a campaign saves several runner chunks at a time
+STORE_CHUNK_SIZE = 1000
+
+# bump this whenever a change to the game rules or to how randomness is drawn means
+# the same seed no longer plays the same game, so cached results get thrown out
+ENGINE_VERSION = 3
+
+# seeds for a run of games - game i always gets the i-th child of the root seed
+# (what SeedSequence.spawn would give it), so each game's result only depends on
+# the root seed and its index, never on how games are split between workers
+def game_seeds(seed, num_games, first_game=0):
+    seed = as_seed_sequence(seed)
+    return [child_seed(seed, i) for i in range(first_game, first_game + num_games)]
+
+# anything np.random.SeedSequence takes, or a SeedSequence itself
+def as_seed_sequence(seed):
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+# play one game per seed, this is the job each worker process runs
+# the same Game is reset and reused for every seed rather than set up from scratch
+# with a trace_dir, the dice and auction picks of every game are written there as one trace chunk
+def play_games(ruleset, seeds, instrument=False, trace_dir=None):
+    game = ruleset.make_game(instrument=instrument)
+    if trace_dir is not None:
+        game.dice = DiceRecorder(game.dice)
+        traces = []
+    stats = []
+    for seed in seeds:
+        game.reset(seed)
+        game.run()
+        stats.append(game.stats())
+        if trace_dir is not None:
+            traces.append((seed_index(seed), bytes(game.dice.rolls), bytes(game.dice.picks)))
+    if trace_dir is not None and len(traces) > 0:
+        TraceStore(trace_dir).append(traces)
+    return stats
+
+# the index of a game from its seed, game_seeds gives game i the seed with i at the end of its spawn key
+def seed_index(seed):
+    return seed.spawn_key[-1]
+
+# play games for a list of seeds a chunk at a time, handing back each chunk's stats in order
+# max_workers of None uses every core, 1 plays the games in this process
+def play_chunks(ruleset, seeds, max_workers=None, chunk_size=RUNNER_CHUNK_SIZE, instrument=False, trace_dir=None):
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+    if max_workers == 1:
+        for chunk in chunks:
+            yield play_games(ruleset, chunk, instrument, trace_dir)
+    else:
+        with ProcessPoolExecutor(max_workers) as pool:
+            yield from pool.map(play_games, repeat(ruleset), chunks, repeat(instrument), repeat(trace_dir))
+
+# play a number of games with the given rules, spread over a pool of worker processes
+# stats come back in game order, and are the same for any number of workers
+# with instrument, every Stats also carries the GameCounters of its game
+# with a trace_dir, every game is traced into a TraceStore there and can be replayed later
+# with a progress reporter, every chunk is added to it as it comes back
+def run_games(ruleset, num_games, seed=None, max_workers=None, chunk_size=RUNNER_CHUNK_SIZE, instrument=False,
+              trace_dir=None, progress=None):
+    seed = as_seed_sequence(seed)
+    if trace_dir is not None:
+        TraceStore(trace_dir).start(ruleset, seed)
+    stats = []
+    for chunk_stats in play_chunks(ruleset, game_seeds(seed, num_games), max_workers, chunk_size, instrument, trace_dir):
+        stats.extend(chunk_stats)
+        if progress is not None:
+            progress.add(chunk_stats)
+    return stats
+
+# play a number of games like run_games, but stream the stats into a ResultStore a chunk at a time
+# if the store already holds part of this campaign, only the games still missing are played
+def run_campaign(ruleset, num_games, store, seed=None, max_workers=None, chunk_size=RUNNER_CHUNK_SIZE, trace_dir=None,
+                 progress=None, store_chunk_size=STORE_CHUNK_SIZE):
+    root_seed = store.start_campaign(ruleset, num_games, seed)
+    if trace_dir is not None:
+        TraceStore(trace_dir).start(ruleset, root_seed)
+    first_game = store.num_completed
+    seeds = game_seeds(root_seed, num_games - first_game, first_game)
+    unsaved = []
+    for chunk_stats in play_chunks(ruleset, seeds, max_workers, chunk_size, trace_dir=trace_dir):
+        unsaved.extend(chunk_stats)
+        if len(unsaved) >= store_chunk_size:
+            store.append(unsaved)
+            unsaved = []
+        if progress is not None:
+            progress.add(chunk_stats)
+    if len(unsaved) > 0:
+        store.append(unsaved)
+    return store
+
+# a game part way through, small enough to pickle and send to another process
+# players are kept as arrays, who owns each square as an array of player indices (what each player
+# holds is worked back out from it), the single-valued counts as a tuple, the state of the dice
+# stream, and the GameCounters of an instrumented game
+class GameSnapshot:
+    __slots__ = ("ruleset", "counts", "money", "space", "sentence", "eliminated", "owner", "ever_bought",
+                 "dice_state", "counters")
+
+    def __init__(self, ruleset, counts, money, space, sentence, eliminated, owner, ever_bought, dice_state, counters=None):
+        self.ruleset = ruleset
+        self.counts = counts
+        self.money = money
+        self.space = space
+        self.sentence = sentence
+        self.eliminated = eliminated
+        self.owner = owner
+        self.ever_bought = ever_bought
+        self.dice_state = dice_state
+        self.counters = counters
+
+# play one branch of a fork: restore the snapshot into a game with the branch's rules
+# (the snapshot's own if None), and play it out with its dice from the snapshot on, or from a new seed
+def play_branch(snapshot, ruleset=None, seed=None):
+    if ruleset is None:
+        ruleset = snapshot.ruleset
+    game = ruleset.make_game(instrument=snapshot.counters is not None)
+    game.restore(snapshot)
+    if seed is not None:
+        # fresh dice, even if the snapshot was carrying on a replayed trace
+        game.dice = TurnDice(seed)
+    game.run()
+    return game.stats()
+
+# play a mid-game snapshot out several ways, one branch per (ruleset, seed) pair, and return the stats
+# of every branch in order - branches that keep the snapshot's dice (seed of None) roll the same dice,
+# so they differ only by their rules - for a snapshot of a replayed game those are the rest of its trace,
+# and a branch that needs more dice than the traced game used fails with a ValueError
+# max_workers of 1 plays the branches in this process, otherwise they are spread over worker processes
+def fork(snapshot, branches, max_workers=1):
+    rulesets = [ruleset for ruleset, seed in branches]
+    seeds = [seed for ruleset, seed in branches]
+    if max_workers == 1:
+        return [play_branch(snapshot, ruleset, seed) for ruleset, seed in branches]
+    with ProcessPoolExecutor(max_workers) as pool:
+        return list(pool.map(play_branch, repeat(snapshot), rulesets, seeds))
+
+#####################
+###    RESULTS    ###
+#####################
+
+# on-disk layout of one game's stats, one field per Stats attribute
+STATS_DTYPE = np.dtype([("winner", np.int32),
+                        ("num_turns_passed", np.int64),
+                        ("turn_last_property_bought", np.int64),
+                        ("num_trips_around", np.int64),
+                        ("trip_last_property_bought", np.int64),
+                        ("censored", np.bool_)])
+
+# pack a list of Stats into a structured array
+def stats_array(stats_list):
+    array = np.empty(len(stats_list), dtype=STATS_DTYPE)
+    for name in STATS_DTYPE.names:
+        array[name] = [getattr(stats, name) for stats in stats_list]
+    return array
+
+# write a file so that it is either fully there or not there at all, even if we crash part way
+def write_atomically(path, write):
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+# keeps the stats of one campaign (many games of one ruleset) in a directory on disk
+# stats are written as fixed-dtype .npy chunks that can be memory-mapped, numbered in order, and
+# progress.json records how many are complete, so a campaign that gets interrupted picks up where it stopped
+class ResultStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self.progress_path = os.path.join(directory, "progress.json")
+        os.makedirs(directory, exist_ok=True)
+
+        # what this campaign is, and how much of it is done
+        self.progress = {"engine": None, "ruleset": None, "entropy": None, "num_games": 0, "num_completed": 0, "num_chunks": 0}
+        if os.path.exists(self.progress_path):
+            with open(self.progress_path) as file:
+                self.progress = json.load(file)
+
+        # stores written before chunks were only counted list every chunk's name
+        if "chunks" in self.progress:
+            self.progress["num_chunks"] = len(self.progress.pop("chunks"))
+
+    @property
+    def num_completed(self):
+        return self.progress["num_completed"]
+
+    # record the engine, ruleset and seed of a campaign, or check them against the one already in the store
+    # a campaign from another engine version can't be carried on, its seeds would play different games
+    # returns the root seed the games should be played with
+    def start_campaign(self, ruleset, num_games, seed=None):
+        rules = [ruleset.num_players, ruleset.properties_auctioned, ruleset.free_parking_gives_500,
+                 ruleset.rounds_before_jacking_rent, ruleset.max_turns, ruleset.stall_rounds]
+        if self.progress["ruleset"] is None:
+            root_seed = as_seed_sequence(seed)
+            self.progress["engine"] = ENGINE_VERSION
+            self.progress["ruleset"] = rules
+            self.progress["entropy"] = root_seed.entropy
+            self.progress["num_games"] = num_games
+            self.save_progress()
+            return root_seed
+
+        # stores from before the engine version was recorded have no engine at all
+        engine = self.progress.get("engine")
+        if engine != ENGINE_VERSION:
+            raise ValueError("store in " + self.directory + " holds a campaign made by "
+                             + ("an older engine" if engine is None else "engine version " + str(engine)))
+        if self.progress["ruleset"] != rules:
+            raise ValueError("store in " + self.directory + " holds a campaign for ruleset " + str(self.progress["ruleset"]))
+        if seed is not None and as_seed_sequence(seed).entropy != self.progress["entropy"]:
+            raise ValueError("store in " + self.directory + " holds a campaign with a different seed")
+        self.progress["num_games"] = max(num_games, self.progress["num_games"])
+        self.save_progress()
+        return np.random.SeedSequence(self.progress["entropy"])
+
+    def save_progress(self):
+        write_atomically(self.progress_path, lambda file: file.write(json.dumps(self.progress).encode()))
+
+    @staticmethod
+    def chunk_name(chunk):
+        return "chunk_" + str(chunk).zfill(6) + ".npy"
+
+    # write the stats of the next games of the campaign as a new chunk, then checkpoint
+    def append(self, stats_list):
+        array = stats_array(stats_list)
+        path = os.path.join(self.directory, self.chunk_name(self.progress["num_chunks"]))
+        write_atomically(path, lambda file: np.save(file, array))
+        self.progress["num_chunks"] += 1
+        self.progress["num_completed"] += len(array)
+        self.save_progress()
+
+    # every completed chunk, memory-mapped rather than read in
+    # chunks saved before games could be censored are copied into the current dtype, none of those games were
+    def chunks(self):
+        chunks = []
+        for number in range(self.progress["num_chunks"]):
+            chunk = np.load(os.path.join(self.directory, self.chunk_name(number)), mmap_mode="r")
+            if chunk.dtype != STATS_DTYPE:
+                converted = np.zeros(len(chunk), dtype=STATS_DTYPE)
+                for field in chunk.dtype.names:
+                    converted[field] = chunk[field]
+                chunk = converted
+            chunks.append(chunk)
+        return chunks
+
+    # all stats of the campaign as one structured array
+    # a single chunk stays memory-mapped, several are joined into one array
+    def load(self):
+        chunks = self.chunks()
+        if len(chunks) == 1:
+            return chunks[0]
+        if len(chunks) == 0:
+            return np.empty(0, dtype=STATS_DTYPE)
+        return np.concatenate(chunks)
+
+    # one field of every game in the campaign, e.g. "winner"
+    def column(self, name):
+        chunks = self.chunks()
+        if len(chunks) == 1:
+            return chunks[0][name]
+        if len(chunks) == 0:
+            return np.empty(0, dtype=STATS_DTYPE[name])
+        return np.concatenate([chunk[name] for chunk in chunks])
+
+# where one game's trace sits in its chunk's files, in bytes
+TRACE_INDEX_DTYPE = np.dtype([("game", np.int64),
+                              ("rolls_start", np.int64), ("rolls_end", np.int64),
+                              ("picks_start", np.int64), ("picks_end", np.int64)])
+
+# keeps the traces of a run of games in a directory on disk, so any one game can be replayed on its own
+# trace.json records the ruleset, and each chunk of games is three files: the rolls and the picks of
+# every game one after another as raw bytes, which can be memory-mapped, and an index of where each
+# game starts and ends, written last so a chunk with an index is complete
+# chunks are named after their first game, so any number of processes can add chunks at once
+class TraceStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self.header_path = os.path.join(directory, "trace.json")
+        os.makedirs(directory, exist_ok=True)
+
+    # record the ruleset and seed the traced games are played with
+    def start(self, ruleset, seed=None):
+        header = {"ruleset": [ruleset.num_players, ruleset.properties_auctioned, ruleset.free_parking_gives_500,
+                              ruleset.rounds_before_jacking_rent, ruleset.max_turns, ruleset.stall_rounds],
+                  "entropy": as_seed_sequence(seed).entropy}
+        write_atomically(self.header_path, lambda file: file.write(json.dumps(header).encode()))
+
+    def ruleset(self):
+        with open(self.header_path) as file:
+            return Ruleset(*json.load(file)["ruleset"])
+
+    # write the traces of a chunk of games, a list of (game index, rolls, picks)
+    def append(self, traces):
+        name = "traces_" + str(traces[0][0]).zfill(9)
+        index = np.zeros(len(traces), dtype=TRACE_INDEX_DTYPE)
+        rolls_end = 0
+        picks_end = 0
+        for row, (game, rolls, picks) in zip(index, traces):
+            row["game"] = game
+            row["rolls_start"] = rolls_end
+            row["picks_start"] = picks_end
+            rolls_end += len(rolls)
+            picks_end += len(picks)
+            row["rolls_end"] = rolls_end
+            row["picks_end"] = picks_end
+        base = os.path.join(self.directory, name)
+        write_atomically(base + ".rolls", lambda file: file.write(b"".join(rolls for _, rolls, _ in traces)))
+        write_atomically(base + ".picks", lambda file: file.write(b"".join(picks for _, _, picks in traces)))
+        write_atomically(base + ".npy", lambda file: np.save(file, index))
+
+    # the names of every complete chunk, in game order
+    def chunk_names(self):
+        return sorted(name[:-len(".npy")] for name in os.listdir(self.directory)
+                      if name.startswith("traces_") and name.endswith(".npy"))
+
+    # the index of every complete chunk, keyed by chunk name
+    def chunk_indexes(self):
+        return {name: np.load(os.path.join(self.directory, name + ".npy")) for name in self.chunk_names()}
+
+    # the index of every traced game
+    def games(self):
+        indexes = list(self.chunk_indexes().values())
+        if len(indexes) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([index["game"] for index in indexes])
+
+    # the rolls and picks of one game, read straight from the memory-mapped chunk files
+    # each chunk holds a run of games and is named after the first, so only the index of the last chunk
+    # starting at or before the game is read
+    def load(self, game):
+        names = self.chunk_names()
+        first_games = [int(name[len("traces_"):]) for name in names]
+        position = bisect.bisect_right(first_games, game) - 1
+        if position >= 0:
+            base = os.path.join(self.directory, names[position])
+            index = np.load(base + ".npy")
+            rows = np.flatnonzero(index["game"] == game)
+            if len(rows) > 0:
+                row = index[rows[0]]
+                rolls = read_bytes(base + ".rolls", row["rolls_start"], row["rolls_end"])
+                picks = read_bytes(base + ".picks", row["picks_start"], row["picks_end"])
+                return rolls, picks
+        raise KeyError("no trace of game " + str(game) + " in " + self.directory)
+
+    # a Game set up to play one traced game over again, exactly as it went
+    # call run to play it out, or step to go through it a turn at a time
+    def replay(self, game, instrument=False):
+        rolls, picks = self.load(game)
+        replay = self.ruleset().make_game(instrument=instrument)
+        replay.dice = ReplayDice(rolls, picks)
+        return replay
+
+# bytes start to end of a file as a uint8 array, memory-mapped so only those bytes get read
+def read_bytes(path, start, end):
+    if end <= start:
+        return np.empty(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r", offset=int(start), shape=(int(end - start),))
+
+#####################
+### ADAPTIVE RUNS ###
+#####################
+
+# running count, sum and sum of squares of whole numbers
+# these are kept as exact Python ints, so running means built from different
+# parts of the data can be merged in any order and still give the same answer
+class RunningMean:
+    __slots__ = ("count", "total", "total_squares")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.total_squares = 0
+
+    # add an array of whole numbers
+    def add(self, values):
+        values = np.asarray(values, dtype=np.int64).tolist()
+        self.count += len(values)
+        self.total += sum(values)
+        self.total_squares += sum(value * value for value in values)
+
+    # fold in another running mean
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.total_squares += other.total_squares
+
+    def mean(self):
+        if self.count == 0:
+            return np.nan
+        return self.total / self.count
+
+    # sample variance, worked out from the exact sums before dividing
+    def variance(self):
+        if self.count < 2:
+            return np.nan
+        return (self.count * self.total_squares - self.total * self.total) / (self.count * (self.count - 1))
+
+    # half the width of a normal-approximation confidence interval for the mean
+    def half_width(self, confidence=95):
+        if self.count < 2:
+            return np.inf
+        z = NormalDist().inv_cdf(0.5 + confidence / 200)
+        return z * np.sqrt(self.variance() / self.count)
+
+# running estimates of the three stats we report, updated as games come in
+class RunningEstimates:
+    __slots__ = ("turns", "trips", "all_props_bought", "censored")
+
+    def __init__(self):
+        # turns passed in every game, trip the last property was bought in games where
+        # every property was bought, and 1 or 0 for whether every property was bought
+        # censored games are left out of these, like in bootstrap_stats, and only counted
+        self.turns = RunningMean()
+        self.trips = RunningMean()
+        self.all_props_bought = RunningMean()
+        self.censored = RunningMean()
+
+    # add a list of Stats or a structured array of stats
+    def add(self, game_array):
+        turns, trips, censored = stats_columns(game_array)
+        self.censored.add(censored)
+        turns = turns[~censored]
+        trips = trips[~censored]
+        self.turns.add(turns)
+        self.trips.add(trips[trips != -1])
+        self.all_props_bought.add(trips != -1)
+
+    # fold in the estimates from another set of games
+    def merge(self, other):
+        self.turns.merge(other.turns)
+        self.trips.merge(other.trips)
+        self.all_props_bought.merge(other.all_props_bought)
+        self.censored.merge(other.censored)
+
+    # every game played, censored or not
+    @property
+    def num_games(self):
+        return self.censored.count
+
+    @property
+    def num_censored(self):
+        return self.censored.total
+
+    # the percentage of games where every property was bought, and the half-width of its interval
+    def percent_all_props_bought(self):
+        return 100 * self.all_props_bought.mean()
+
+    def percent_half_width(self, confidence=95):
+        return 100 * self.all_props_bought.half_width(confidence)
+
+    # have all the requested half-widths been reached, targets of None are ignored
+    def precise_enough(self, turns_half_width, trips_half_width=None, percent_half_width=None, confidence=95):
+        if turns_half_width is not None and self.turns.half_width(confidence) > turns_half_width:
+            return False
+        if trips_half_width is not None and self.trips.half_width(confidence) > trips_half_width:
+            return False
+        if percent_half_width is not None and self.percent_half_width(confidence) > percent_half_width:
+            return False
+        return True
+
+# what came out of an adaptive run of one ruleset
+class AdaptiveResult:
+    def __init__(self, results, estimates, reached_target):
+        self.results = results
+        self.estimates = estimates
+        self.num_games = estimates.num_games
+        self.reached_target = reached_target
+
+# play games of a ruleset in batches until the confidence intervals of the three stats
+# are narrower than the targets (half-widths, in turns, trips and percentage points),
+# or until max_games have been played
+# games are seeded by index like run_games, so a rerun with the same seed stops at the same point
+# with a store, games are streamed to disk and games already in the store count towards the targets
+def run_until_precise(ruleset, turns_half_width, trips_half_width=None, percent_half_width=None,
+                      max_games=100000, batch_size=200, min_games=50, confidence=95, seed=None,
+                      max_workers=None, chunk_size=RUNNER_CHUNK_SIZE, store=None, trace_dir=None, progress=None):
+    estimates = RunningEstimates()
+    if store is not None:
+        root_seed = store.start_campaign(ruleset, max_games, seed)
+        estimates.add(store.load())
+        results = None
+    else:
+        root_seed = as_seed_sequence(seed)
+        results = []
+    if trace_dir is not None:
+        TraceStore(trace_dir).start(ruleset, root_seed)
+
+    while estimates.num_games < max_games:
+        if (estimates.num_games >= min_games and
+                estimates.precise_enough(turns_half_width, trips_half_width, percent_half_width, confidence)):
+            break
+
+        # a store gets each batch as one file
+        num_games = min(batch_size, max_games - estimates.num_games)
+        seeds = game_seeds(root_seed, num_games, estimates.num_games)
+        batch_stats = []
+        for chunk_stats in play_chunks(ruleset, seeds, max_workers, chunk_size, trace_dir=trace_dir):
+            estimates.add(chunk_stats)
+            if progress is not None:
+                progress.add(chunk_stats)
+            batch_stats.extend(chunk_stats)
+        if store is not None:
+            store.append(batch_stats)
+        else:
+            results.extend(batch_stats)
+
+    reached_target = estimates.precise_enough(turns_half_width, trips_half_width, percent_half_width, confidence)
+    if store is not None:
+        results = store.load()
+    else:
+        results = stats_array(results)
+    return AdaptiveResult(results, estimates, reached_target)
+
+#####################
+###  AGGREGATION  ###
+#####################
+
+# histogram bins for aggregated games: turns passed go in bins of TURNS_BIN_WIDTH and trips in
+# bins of one, and anything past the last bin is counted in the last bin
+TURNS_BIN_WIDTH = 25
+NUM_TURNS_BINS = 400
+NUM_TRIPS_BINS = 100
+
+# games played per batch by run_aggregated, only one batch of seeds is held at a time
+AGGREGATE_BATCH_SIZE = 10000
+
+# everything we report about a set of games, kept as running totals so memory stays the same
+# however many games are added: the running estimates of the three stats, fixed-bin histograms
+# of turns passed and of the trip the last property was bought in, and how many times each player won
+# aggregates of different chunks of games merge exactly, in any order
+class GameAggregate:
+    __slots__ = ("num_players", "estimates", "turns_histogram", "trips_histogram", "winners")
+
+    def __init__(self, num_players):
+        self.num_players = num_players
+        self.estimates = RunningEstimates()
+        self.turns_histogram = np.zeros(NUM_TURNS_BINS, dtype=np.int64)
+        self.trips_histogram = np.zeros(NUM_TRIPS_BINS, dtype=np.int64)
+        self.winners = np.zeros(num_players, dtype=np.int64)
+
+    # add a list of Stats or a structured array of stats
+    # censored games are only counted, like in the running estimates
+    def add(self, game_array):
+        if not isinstance(game_array, np.ndarray):
+            game_array = stats_array(game_array)
+        self.estimates.add(game_array)
+        turns, trips, censored = stats_columns(game_array)
+        turns = turns[~censored]
+        trips = trips[~censored]
+        trips = trips[trips != -1]
+        self.turns_histogram += np.bincount(np.minimum(turns // TURNS_BIN_WIDTH, NUM_TURNS_BINS - 1), minlength=NUM_TURNS_BINS)
+        self.trips_histogram += np.bincount(np.minimum(trips, NUM_TRIPS_BINS - 1), minlength=NUM_TRIPS_BINS)
+        winners = np.asarray(game_array["winner"])
+        self.winners += np.bincount(winners[winners >= 0], minlength=self.num_players)
+
+    # fold in the aggregate of another set of games with the same number of players
+    def merge(self, other):
+        if other.num_players != self.num_players:
+            raise ValueError("can't merge aggregates of games with " + str(self.num_players) + " and "
+                             + str(other.num_players) + " players")
+        self.estimates.merge(other.estimates)
+        self.turns_histogram += other.turns_histogram
+        self.trips_histogram += other.trips_histogram
+        self.winners += other.winners
+
+    @property
+    def num_games(self):
+        return self.estimates.num_games
+
+    # left edges of the histogram bins
+    @staticmethod
+    def turns_bin_edges():
+        return np.arange(NUM_TURNS_BINS) * TURNS_BIN_WIDTH
+
+    @staticmethod
+    def trips_bin_edges():
+        return np.arange(NUM_TRIPS_BINS)
+
+# play a chunk of games and hand back only their aggregate, this is the job each worker process runs
+def aggregate_games(ruleset, seeds):
+    aggregate = GameAggregate(ruleset.num_players)
+    aggregate.add(play_games(ruleset, seeds))
+    return aggregate
+
+# play a number of games like run_games, but keep only their GameAggregate
+# seeds are made a batch at a time and workers send back aggregates rather than stats,
+# so memory doesn't grow with the number of games, and the result is the same for any number of workers
+def run_aggregated(ruleset, num_games, seed=None, max_workers=None, chunk_size=RUNNER_CHUNK_SIZE,
+                   batch_size=AGGREGATE_BATCH_SIZE, progress=None):
+    root_seed = as_seed_sequence(seed)
+    aggregate = GameAggregate(ruleset.num_players)
+    pool = None if max_workers == 1 else ProcessPoolExecutor(max_workers)
+    try:
+        for first_game in range(0, num_games, batch_size):
+            seeds = game_seeds(root_seed, min(batch_size, num_games - first_game), first_game)
+            chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+            if pool is None:
+                parts = (aggregate_games(ruleset, chunk) for chunk in chunks)
+            else:
+                parts = pool.map(aggregate_games, repeat(ruleset), chunks)
+            for part in parts:
+                aggregate.merge(part)
+                if progress is not None:
+                    progress.add(part)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return aggregate
+
+#####################
+###   PROGRESS    ###
+#####################
+
+# reports how a long run is going: games done, games and turns per second, time left, and the
+# estimates of each ruleset so far, printed and appended to a JSON-lines metrics file every interval
+# seconds from a background thread
+# games are added a chunk at a time, by the process handing out the work, as the chunks come back,
+# so workers and the game loop don't do anything extra, and each line carries the process id
+# so several drivers can share one metrics file
+# num_games is how many games the whole run should play, None if that isn't known up front
+class ProgressReporter:
+    def __init__(self, interval=10, metrics_path=None, stream=sys.stderr, num_games=None):
+        self.interval = interval
+        self.metrics_path = metrics_path
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+        # games expected, done, and their turns, over every ruleset
+        self.num_games = num_games
+        self.num_completed = 0
+        self.num_turns = 0
+        self.start_time = time.monotonic()
+
+        # running estimates of every ruleset so far, and the one games are being added to now
+        self.estimates = {}
+        self.ruleset_name = None
+
+    # games added from now on belong to this ruleset
+    def start_ruleset(self, name):
+        with self.lock:
+            self.ruleset_name = name
+            self.estimates.setdefault(name, RunningEstimates())
+
+    # add a chunk of finished games - a list of Stats, a structured array of stats or a GameAggregate
+    # an aggregate only knows the turns of games that weren't censored
+    def add(self, games):
+        if isinstance(games, GameAggregate):
+            estimates = games.estimates
+            num_turns = estimates.turns.total
+        else:
+            estimates = RunningEstimates()
+            estimates.add(games)
+            num_turns = int(stats_columns(games)[0].sum())
+        with self.lock:
+            self.estimates.setdefault(self.ruleset_name, RunningEstimates()).merge(estimates)
+            self.num_completed += estimates.num_games
+            self.num_turns += num_turns
+
+    # everything reported, as one dict
+    def snapshot(self):
+        with self.lock:
+            elapsed = time.monotonic() - self.start_time
+            games_per_second = self.num_completed / elapsed if elapsed > 0 else 0.0
+            eta = None
+            if self.num_games is not None and games_per_second > 0:
+                eta = max(0, self.num_games - self.num_completed) / games_per_second
+            rulesets = {}
+            for name, estimates in self.estimates.items():
+                rulesets[name] = {"games": estimates.num_games,
+                                  "censored": estimates.num_censored,
+                                  "mean_turns_passed": json_number(estimates.turns.mean()),
+                                  "mean_trip_last_property_bought": json_number(estimates.trips.mean()),
+                                  "percent_all_props_bought": json_number(estimates.percent_all_props_bought())}
+            return {"time": time.time(), "pid": os.getpid(), "elapsed": elapsed,
+                    "games_completed": self.num_completed, "games_total": self.num_games,
+                    "games_per_second": games_per_second,
+                    "turns_per_second": self.num_turns / elapsed if elapsed > 0 else 0.0,
+                    "eta_seconds": eta, "ruleset": self.ruleset_name, "rulesets": rulesets}
+
+    # print one line about the run so far, and append the full snapshot to the metrics file
+    def report(self):
+        snapshot = self.snapshot()
+        total = "?" if snapshot["games_total"] is None else str(snapshot["games_total"])
+        eta = "?" if snapshot["eta_seconds"] is None else format_duration(snapshot["eta_seconds"])
+        line = (str(snapshot["games_completed"]) + "/" + total + " games, "
+                + format(snapshot["games_per_second"], ".1f") + " games/s, "
+                + format(snapshot["turns_per_second"], ".0f") + " turns/s, ETA " + eta)
+        current = snapshot["rulesets"].get(snapshot["ruleset"])
+        if current is not None:
+            line += (" | " + str(snapshot["ruleset"]) + ": mean turns " + str(current["mean_turns_passed"])
+                     + ", mean trip " + str(current["mean_trip_last_property_bought"])
+                     + ", all props bought " + str(current["percent_all_props_bought"]) + "%")
+        if self.stream is not None:
+            print(line, file=self.stream, flush=True)
+        if self.metrics_path is not None:
+            with open(self.metrics_path, "a") as file:
+                file.write(json.dumps(snapshot) + "\n")
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.report()
+
+    # start reporting in the background, and stop with a final report
+    def start(self):
+        self.start_time = time.monotonic()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.report()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+# nan isn't valid JSON, so undefined estimates are written as null, and numbers are rounded for reading
+def json_number(value):
+    if value is None or np.isnan(value):
+        return None
+    return round(float(value), 4)
+
+# seconds as h:mm:ss
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return str(hours) + ":" + str(minutes).zfill(2) + ":" + str(seconds).zfill(2)
+
+#####################
+###    PAIRED     ###
+#####################
+
+# play the same games under several rulesets - game i of every ruleset gets the same seed, so the
+# same dice rolls and auction picks, and the differences between rulesets aren't swamped by luck
+# returns one structured array of stats per ruleset, in the same order
+def run_paired(rulesets, num_games, seed=None, max_workers=None, chunk_size=RUNNER_CHUNK_SIZE):
+    root_seed = as_seed_sequence(seed)
+    return [stats_array(run_games(ruleset, num_games, root_seed, max_workers, chunk_size)) for ruleset in rulesets]
+
+# holds the bootstrapped differences between two paired runs (first minus second) of the three stats
+# also how correlated the game lengths of the two runs were, the higher the more pairing helped
+class PairedDifference:
+    def __init__(self, num_pairs, num_censored, turns_difference, trips_difference, percent_difference,
+                 turns_distribution, trips_distribution, percent_distribution, turns_correlation, confidence):
+        self.num_pairs = num_pairs
+        self.num_censored = num_censored
+        self.turns_difference = turns_difference
+        self.trips_difference = trips_difference
+        self.percent_difference = percent_difference
+        self.turns_distribution = turns_distribution
+        self.trips_distribution = trips_distribution
+        self.percent_distribution = percent_distribution
+        self.turns_correlation = turns_correlation
+        self.confidence = confidence
+        self.turns_interval = percentile_interval(turns_distribution, confidence)
+        self.trips_interval = percentile_interval(trips_distribution, confidence)
+        self.percent_interval = percentile_interval(percent_distribution, confidence)
+
+# mean of the values picked out by each row of indices, counting only those where mask is set
+# rows with nothing to average are nan
+def masked_means(values, mask, indices):
+    counts = mask[indices].sum(axis=1)
+    sums = np.where(mask, values, 0)[indices].sum(axis=1)
+    return np.divide(sums, counts, out=np.full(len(indices), np.nan), where=counts > 0)
+
+# bootstrap the differences between two runs of the same seeded games under different rulesets
+# every resample picks whole pairs, so luck shared by both games of a pair cancels out
+# a pair is left out when either of its games was censored
+def paired_differences(game_array, baseline_array, degree, confidence=95, rng=None):
+    if rng is None:
+        rng = np.random.default_rng()
+
+    turns, trips, censored = stats_columns(game_array)
+    base_turns, base_trips, base_censored = stats_columns(baseline_array)
+    if len(turns) != len(base_turns):
+        raise ValueError("paired runs need the same number of games, got " + str(len(turns)) + " and " + str(len(base_turns)))
+    kept = ~(censored | base_censored)
+    num_censored = int(len(kept) - kept.sum())
+    turns, trips, base_turns, base_trips = turns[kept], trips[kept], base_turns[kept], base_trips[kept]
+    num_pairs = len(turns)
+
+    # per pair, how much longer the game ran, and whether every property was bought in each
+    turns_difference = turns - base_turns
+    bought = trips != -1
+    base_bought = base_trips != -1
+
+    turns_distribution = np.full(degree, np.nan)
+    trips_distribution = np.full(degree, np.nan)
+    percent_distribution = np.full(degree, np.nan)
+    if num_pairs == 0:
+        return PairedDifference(0, num_censored, np.nan, np.nan, np.nan, turns_distribution, trips_distribution,
+                                percent_distribution, np.nan, confidence)
+
+    # resample pairs a chunk of resamples at a time, like bootstrap_stats
+    rows_per_chunk = max(1, BOOTSTRAP_CHUNK_SIZE // num_pairs)
+    for first_row in range(0, degree, rows_per_chunk):
+        rows = min(rows_per_chunk, degree - first_row)
+        chunk = slice(first_row, first_row + rows)
+        indices = rng.integers(0, num_pairs, size=(rows, num_pairs))
+
+        turns_distribution[chunk] = turns_difference[indices].mean(axis=1)
+        trips_distribution[chunk] = masked_means(trips, bought, indices) - masked_means(base_trips, base_bought, indices)
+        percent_distribution[chunk] = 100 * (bought[indices].mean(axis=1) - base_bought[indices].mean(axis=1))
+
+    # the differences themselves come from the whole sample
+    everything = np.arange(num_pairs)[None, :]
+    trips_difference = float(masked_means(trips, bought, everything)[0] - masked_means(base_trips, base_bought, everything)[0])
+    percent_difference = float(100 * (bought.mean() - base_bought.mean()))
+    if num_pairs > 1 and turns.std() > 0 and base_turns.std() > 0:
+        turns_correlation = float(np.corrcoef(turns, base_turns)[0, 1])
+    else:
+        turns_correlation = np.nan
+    return PairedDifference(num_pairs, num_censored, float(turns_difference.mean()), trips_difference, percent_difference,
+                            turns_distribution, trips_distribution, percent_distribution, turns_correlation, confidence)
+
+#####################
+###   PLOTTING    ###
+#####################
+
+# histogram of how many times each player won, from any array or list of winner indices,
+# saved to an image file, games without a winner (-1) are left out
+def plot_winners(winners, num_players, path):
+    winners = np.asarray(winners, dtype=np.int64)
+    plot_winner_counts(np.bincount(winners[winners >= 0], minlength=num_players), path)
+
+# the same histogram from how many times each player won, like GameAggregate.winners
+# matplotlib is only imported here, so importing this module to run games stays cheap
+def plot_winner_counts(counts, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    num_players = len(counts)
+    figure = plt.figure()
+    plt.xticks(ticks=range(num_players), labels=range(1, num_players + 1))
+    plt.bar(range(num_players), counts, width=1, edgecolor='black')
+    plt.xlabel("Winner (Player)")
+    plt.ylabel("# times won")
+    figure.savefig(path)
+    plt.close(figure)
+
 #####################
 ###  SIMULATIONS  ###
 #####################
-num_sims_per_ruleset = 500
-num_players = 15
-how_much_to_bootstrap = 10000
-rounds_before_rent_increase = 10
-
-### GAME TYPE 1 ###
-# no optional rules
-# properties auctioned, free parking does not give 500 dollars
-game_type_1_stats = []
-game_type_1_winners = []
-for i in range(num_sims_per_ruleset):
-  
-    game = Game(num_players, True, False, rounds_before_rent_increase)
-
-    # run game and get stats
-    winner, num_turns_passed, turn_last_property_bought, num_trips_around, trip_last_property_bought = game.run()
-    stats = Stats(winner, num_turns_passed, turn_last_property_bought, num_trips_around, trip_last_property_bought)
-
-    game_type_1_stats.append(stats)
-    game_type_1_winners.append(winner)
-
-game_type_1_turns_passed, game_type_1_prop_bought, percent_type_1_games_ended_with_all_props_bought = bootstrap_stats(game_type_1_stats, how_much_to_bootstrap)
-
-plt.xticks(ticks=[0,1,2,3], labels=[1,2,3,4])
-plt.hist(game_type_1_winners, bins=num_players, edgecolor='black')
-plt.xlabel("Winner (Player)")
-plt.ylabel("# times won")
-plt.show()
-
-print("GAME TYPE 1 - no optional rules")
-print("MEAN TURNS PASSED: " + str(game_type_1_turns_passed))
-print("MEAN TURN LAST PROP. BOUGHT: " + str(game_type_1_prop_bought))
-print("PERCENT GAMES ALL PROPS BOUGHT: " + str(percent_type_1_games_ended_with_all_props_bought))
-print()
-
-### GAME TYPE 2 ###
-# rule for part c.i active
-# properties auctioned, free parking gives 500 dollars
-game_type_2_stats = []
-game_type_2_winners = []
-for i in range(num_sims_per_ruleset):
-    game = Game(num_players, True, True, rounds_before_rent_increase)
-    
-    # run game and get stats
-    winner, num_turns_passed, turn_last_property_bought, num_trips_around, trip_last_property_bought = game.run()
-    stats = Stats(winner, num_turns_passed, turn_last_property_bought, num_trips_around, trip_last_property_bought)
-
-    game_type_2_stats.append(stats)
-    game_type_2_winners.append(winner)
-
-game_type_2_turns_passed, game_type_2_prop_bought, percent_type_2_games_ended_with_all_props_bought = bootstrap_stats(game_type_2_stats, how_much_to_bootstrap)
-
-plt.xticks(ticks=[0,1,2,3], labels=[1,2,3,4])
-plt.hist(game_type_2_winners, bins=num_players, edgecolor='black')
-plt.xlabel("Winner (Player)")
-plt.ylabel("# times won")
-plt.show()
-
-print("GAME TYPE 2 - Free Parking nets you 500$")
-print("MEAN TURNS PASSED: " + str(game_type_2_turns_passed))
-print("MEAN TURN LAST PROP. BOUGHT: " + str(game_type_2_prop_bought))
-print("PERCENT GAMES ALL PROPS BOUGHT: " + str(percent_type_2_games_ended_with_all_props_bought))
-print()
-
-### GAME TYPE 3 ###
-# rule for part c.ii active
-# properties are not auctioned, free parking does not give 500 dollars
-game_type_3_stats = []
-game_type_3_winners = []
-for i in range(num_sims_per_ruleset):
-    game = Game(num_players, False, False, rounds_before_rent_increase)
-
-    # run game and get stats
-    winner, num_turns_passed, turn_last_property_bought, num_trips_around, trip_last_property_bought = game.run()
-    stats = Stats(winner, num_turns_passed, turn_last_property_bought, num_trips_around, trip_last_property_bought)
-
-    game_type_3_stats.append(stats)
-    game_type_3_winners.append(winner)
-
-game_type_3_turns_passed, game_type_3_prop_bought, percent_type_3_games_ended_with_all_props_bought = bootstrap_stats(game_type_3_stats, how_much_to_bootstrap)
-
-plt.xticks(ticks=[0,1,2,3], labels=[1,2,3,4])
-plt.hist(game_type_3_winners, bins=num_players, edgecolor='black')
-plt.xlabel("Winner (Player)")
-plt.ylabel("# times won")
-plt.show()
-
-print("GAME TYPE 3 - Properties are not aucitoned")
-print("MEAN TURNS PASSED: " + str(game_type_3_turns_passed))
-print("MEAN TURN LAST PROP. BOUGHT: " + str(game_type_3_prop_bought))
-print("PERCENT GAMES ALL PROPS BOUGHT: " + str(percent_type_3_games_ended_with_all_props_bought))
-print()
-
-### GAME TYPE 4 ###
-# both rules at once
-# properties are not auctioned, free parking gives 500 dollars
-game_type_4_stats = []
-game_type_4_winners = []
-for i in range(num_sims_per_ruleset):
-    game = Game(num_players, False, True, rounds_before_rent_increase)
-
-    # run game and get stats
-    winner, num_turns_passed, turn_last_property_bought, num_trips_around, trip_last_property_bought = game.run()
-    stats = Stats(winner, num_turns_passed, turn_last_property_bought, num_trips_around, trip_last_property_bought)
-
-    game_type_4_stats.append(stats)
-    game_type_4_winners.append(winner)
-
-game_type_4_turns_passed, game_type_4_prop_bought, percent_type_4_games_ended_with_all_props_bought = bootstrap_stats(game_type_4_stats, how_much_to_bootstrap)
-
-plt.xticks(ticks=[0,1,2,3], labels=[1,2,3,4])
-plt.hist(game_type_4_winners, bins=num_players, edgecolor='black')
-plt.xlabel("Winner (Player)")
-plt.ylabel("# times won")
-plt.show()
-
-print("GAME TYPE 4 - both optional rules included")
-print("MEAN TURNS PASSED: " + str(game_type_4_turns_passed))
-print("MEAN TURN LAST PROP. BOUGHT: " + str(game_type_4_prop_bought))
-print("PERCENT GAMES ALL PROPS BOUGHT: " + str(percent_type_4_games_ended_with_all_props_bought))
-print()
+
+# the four rulesets we compare: the heading printed for each,
+# then whether properties are auctioned and whether free parking gives 500 dollars
+GAME_TYPES = [
+    # no optional rules
+    ("GAME TYPE 1 - no optional rules", True, False),
+    # rule for part c.i active
+    ("GAME TYPE 2 - Free Parking nets you 500$", True, True),
+    # rule for part c.ii active
+    ("GAME TYPE 3 - Properties are not aucitoned", False, False),
+    # both rules at once
+    ("GAME TYPE 4 - both optional rules included", False, True),
+]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate Monopoly games under four rulesets and bootstrap the results.")
+    parser.add_argument("--players", type=int, default=15, help="number of players in each game")
+    parser.add_argument("--games", type=int, default=500, help="number of games to simulate per ruleset")
+    parser.add_argument("--target-half-width", type=float, default=None,
+                        help="keep playing games until the 95%% CI of mean turns passed is this narrow (half-width, in turns)")
+    parser.add_argument("--trips-half-width", type=float, default=None,
+                        help="also require this half-width for the mean trip the last property was bought")
+    parser.add_argument("--percent-half-width", type=float, default=None,
+                        help="also require this half-width (percentage points) for the percent of games where every property was bought")
+    parser.add_argument("--max-games", type=int, default=100000, help="most games to play per ruleset when targeting a half-width")
+    parser.add_argument("--bootstrap", type=int, default=10000, help="number of bootstrap resamples")
+    parser.add_argument("--rent-interval", type=int, default=10, help="rounds before the rent of every property goes up")
+    parser.add_argument("--max-turns", type=int, default=None, help="turn budget, games still going after it are censored")
+    parser.add_argument("--stall-rounds", type=int, default=None,
+                        help="censor a game once this many rounds pass with nobody eliminated")
+    parser.add_argument("--output-dir", help="directory for stored results and plots, lets an interrupted run resume")
+    parser.add_argument("--plots", action="store_true", help="save a winner histogram per ruleset")
+    parser.add_argument("--instrument", action="store_true",
+                        help="count landings, rent, auctions, jail and eliminations in every game and print the totals")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, every core by default")
+    parser.add_argument("--seed", type=int, default=None, help="root seed, for reproducible runs")
+    parser.add_argument("--trace", action="store_true",
+                        help="write the dice and auction picks of every game to the output directory, so games can be replayed")
+    parser.add_argument("--paired", action="store_true",
+                        help="play the same seeded games under every ruleset and report the differences from game type 1")
+    parser.add_argument("--progress", type=float, default=None, metavar="SECONDS",
+                        help="report progress to stderr every this many seconds")
+    parser.add_argument("--metrics", help="also append progress reports to this JSON-lines file")
+    parser.add_argument("--streaming", action="store_true",
+                        help="keep running totals instead of every game's stats, so memory stays the same however many games are played")
+    args = parser.parse_args(argv)
+    if args.streaming and (args.paired or args.instrument or args.trace or args.target_half_width is not None):
+        parser.error("--streaming can't be combined with --paired, --instrument, --trace or --target-half-width")
+    # instrumented runs keep their counters in memory, so they are neither stored nor adaptive
+    if args.instrument and (args.target_half_width is not None or args.output_dir is not None):
+        parser.error("--instrument can't be combined with --target-half-width or --output-dir")
+    return args
+
+# print the totals of the counters from a set of instrumented games
+def print_counters(counters, num_games):
+    print("EVENTS PER GAME: " + ", ".join(name + " " + format(count / num_games, ".2f")
+                                          for name, count in counters.event_counts().items()))
+    print("RENT PAID PER GAME BY RENT LEVEL: " + str((counters.rent_paid_by_level / num_games).round(1).tolist()))
+    print("MOST LANDED ON:")
+    for square in np.argsort(-counters.landings)[:5]:
+        print("    " + BOARD.names[square] + ": " + format(counters.landings[square] / num_games, ".2f")
+              + " landings, " + format(counters.rent_paid[square] / num_games, ".1f") + " rent paid per game")
+
+# print the bootstrapped differences between two rulesets
+def print_difference(title, difference):
+    print(title)
+    print("DIFFERENCE IN MEAN TURNS PASSED: " + str(difference.turns_difference) + " (95% CI " + str(difference.turns_interval) + ")")
+    print("DIFFERENCE IN MEAN TURN LAST PROP. BOUGHT: " + str(difference.trips_difference) + " (95% CI " + str(difference.trips_interval) + ")")
+    print("DIFFERENCE IN PERCENT GAMES ALL PROPS BOUGHT: " + str(difference.percent_difference) + " (95% CI " + str(difference.percent_interval) + ")")
+    print("PAIRS: " + str(difference.num_pairs) + ", CORRELATION OF TURNS PASSED: " + str(difference.turns_correlation))
+    print()
+
+# print the running estimates of one ruleset, with normal-approximation intervals
+def print_estimates(title, estimates):
+    def interval(running_mean, scale=1):
+        mean = float(scale * running_mean.mean())
+        half_width = float(scale * running_mean.half_width())
+        return " (95% CI " + str((mean - half_width, mean + half_width)) + ")"
+    print(title)
+    print("MEAN TURNS PASSED: " + str(estimates.turns.mean()) + interval(estimates.turns))
+    print("MEAN TURN LAST PROP. BOUGHT: " + str(estimates.trips.mean()) + interval(estimates.trips))
+    print("PERCENT GAMES ALL PROPS BOUGHT: " + str(estimates.percent_all_props_bought()) + interval(estimates.all_props_bought, 100))
+    if estimates.num_censored > 0:
+        print("CENSORED GAMES: " + str(estimates.num_censored) + " of " + str(estimates.num_games) + " (left out of the stats above)")
+    print()
+
+# print the bootstrapped stats of one ruleset
+def print_summary(title, result):
+    print(title)
+    print("MEAN TURNS PASSED: " + str(result.mean_turns_passed) + " (95% CI " + str(result.turns_interval) + ")")
+    print("MEAN TURN LAST PROP. BOUGHT: " + str(result.mean_trip_last_property_bought) + " (95% CI " + str(result.trips_interval) + ")")
+    print("PERCENT GAMES ALL PROPS BOUGHT: " + str(result.percent_all_props_bought) + " (95% CI " + str(result.percent_interval) + ")")
+    if result.num_censored > 0:
+        print("CENSORED GAMES: " + str(result.num_censored) + " of " + str(result.num_games)
+              + (" (included above)" if result.censored_included else " (left out of the stats above)"))
+    print()
+
+def main(argv=None):
+    args = parse_args(argv)
+    output_dir = args.output_dir if args.output_dir is not None else "."
+
+    # paired rulesets all play the same seeded games, so they need one root seed between them,
+    # taken from the first ruleset's store when an unseeded run is resumed
+    seed = args.seed
+    if args.paired and seed is None:
+        seed = np.random.SeedSequence()
+        if args.output_dir is not None:
+            first_store = ResultStore(os.path.join(args.output_dir, "game_type_1"))
+            if first_store.progress["entropy"] is not None:
+                seed = np.random.SeedSequence(first_store.progress["entropy"])
+    paired_results = []
+
+    # progress goes to stderr with --progress, and to the metrics file with --metrics
+    # games already in a store being resumed aren't played again, so the ETA errs on the long side
+    progress = None
+    if args.progress is not None or args.metrics is not None:
+        stream = sys.stderr if args.progress is not None else None
+        num_games = len(GAME_TYPES) * args.games if args.target_half_width is None else None
+        progress = ProgressReporter(args.progress or 10, args.metrics, stream, num_games).start()
+
+    for game_type, (title, properties_auctioned, free_parking_gives_500) in enumerate(GAME_TYPES, 1):
+        ruleset = Ruleset(args.players, properties_auctioned, free_parking_gives_500, args.rent_interval,
+                          args.max_turns, args.stall_rounds)
+        name = "game_type_" + str(game_type)
+
+        # only keep running totals, summarized without bootstrapping
+        if args.streaming:
+            if progress is not None:
+                progress.start_ruleset(name)
+            aggregate = run_aggregated(ruleset, args.games, seed, args.workers, progress=progress)
+            if args.plots:
+                os.makedirs(output_dir, exist_ok=True)
+                plot_winner_counts(aggregate.winners, os.path.join(output_dir, name + "_winners.png"))
+            print_estimates(title, aggregate.estimates)
+            continue
+
+        # run games and get stats, kept on disk if we have somewhere to put them
+        store = None
+        if args.output_dir is not None:
+            store = ResultStore(os.path.join(args.output_dir, name))
+        trace_dir = None
+        if args.trace:
+            trace_dir = os.path.join(output_dir, name + "_traces")
+        if progress is not None:
+            progress.start_ruleset(name)
+
+        # either keep going until the estimates are precise enough, or play a fixed number of games
+        if args.target_half_width is not None:
+            adaptive = run_until_precise(ruleset, args.target_half_width, args.trips_half_width, args.percent_half_width,
+                                         args.max_games, seed=seed, max_workers=args.workers, store=store,
+                                         trace_dir=trace_dir, progress=progress)
+            results = adaptive.results
+            if adaptive.reached_target:
+                print(name + ": reached the target after " + str(adaptive.num_games) + " games")
+            else:
+                print(name + ": stopped at the limit of " + str(adaptive.num_games) + " games without reaching the target")
+        elif args.instrument:
+            game_stats = run_games(ruleset, args.games, seed, args.workers, instrument=True, trace_dir=trace_dir,
+                                   progress=progress)
+            counters = aggregate_counters(game_stats)
+            results = stats_array(game_stats)
+        elif store is not None:
+            run_campaign(ruleset, args.games, store, seed, args.workers, trace_dir=trace_dir, progress=progress)
+            results = store.load()
+        else:
+            results = stats_array(run_games(ruleset, args.games, seed, args.workers, trace_dir=trace_dir,
+                                            progress=progress))
+
+        if args.plots:
+            os.makedirs(output_dir, exist_ok=True)
+            plot_winners(results["winner"][~results["censored"]], args.players, os.path.join(output_dir, name + "_winners.png"))
+
+        print_summary(title, bootstrap_stats(results, args.bootstrap, rng=np.random.default_rng(args.seed)))
+        if args.instrument:
+            print_counters(counters, len(results))
+            print()
+        if args.paired:
+            paired_results.append(results)
+
+    if progress is not None:
+        progress.stop()
+
+    # how each ruleset differs from game type 1, over the games both of them played
+    if args.paired:
+        baseline = paired_results[0]
+        for (title, _, _), results in zip(GAME_TYPES[1:], paired_results[1:]):
+            num_pairs = min(len(results), len(baseline))
+            difference = paired_differences(results[:num_pairs], baseline[:num_pairs], args.bootstrap,
+                                            rng=np.random.default_rng(args.seed))
+            print_difference(title + " MINUS GAME TYPE 1", difference)
+
+if __name__ == "__main__":
+    main()
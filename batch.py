@@ -0,0 +1,344 @@
+# Lockstep batch engine - plays many games with the same rules at once
+# every game's state lives in NumPy arrays, and each step plays one turn in every game
+# that is still going, using the same rules as Game.run in Monopoly.py
+# rare events (eliminations and the auctions they set off) are handled one game at a time
+# once only a few games are left, each is handed to a Game and played out there
+
+import numpy as np
+
+from Monopoly import (BOARD, GameSnapshot, Stats, TurnDice, KIND_PARKING, KIND_TAX, KIND_GOTO, KIND_PROPERTY,
+                      KIND_RAILROAD, KIND_UTILITY)
+
+# creditor value for a player who goes bankrupt to the bank rather than another player
+BANK = -1
+
+# the jail square, and how many turns a player is sentenced to
+JAIL_SQUARE = 10
+JAIL_SENTENCE = 3
+
+# board columns the engine looks up for many games at once
+KINDS = BOARD.kind_array
+COSTS = BOARD.cost_array
+RENTS = BOARD.rent_array
+GROUPS = BOARD.group_array
+OWNABLE = np.array(BOARD.ownable)
+RAILROADS = np.array(BOARD.group_members[BOARD.railroad_group])
+UTILITIES = np.array(BOARD.group_members[BOARD.utility_group])
+
+# the members of every group as rows of the same length, short groups repeat their
+# first member so comparing owners across a row still works
+GROUP_WIDTH = max(len(members) for members in BOARD.group_members)
+GROUP_MEMBERS = np.array([members + (members[0],) * (GROUP_WIDTH - len(members)) for members in BOARD.group_members])
+
+# with this many games or fewer still going, a step costs more than playing each one out in a Game
+HANDOFF_GAMES = 256
+
+# holds the state of a number of games with the same rules, played in lockstep
+class BatchGame:
+    def __init__(self, ruleset, num_games, seed=None):
+        self.ruleset = ruleset
+        self.num_games = num_games
+        self.num_players = ruleset.num_players
+        self.properties_auctioned = ruleset.properties_auctioned
+        self.free_parking_gives_500 = ruleset.free_parking_gives_500
+        self.rounds_before_jacking_rent = ruleset.rounds_before_jacking_rent
+        self.max_turns = ruleset.max_turns
+        self.stall_rounds = ruleset.stall_rounds
+        self.rng = np.random.default_rng(seed)
+
+        # one row per game, one column per player
+        shape = (num_games, self.num_players)
+        self.money = np.full(shape, 1500, dtype=np.int64)
+        self.space = np.zeros(shape, dtype=np.int64)
+        self.sentence = np.zeros(shape, dtype=np.int64)
+        self.eliminated = np.zeros(shape, dtype=bool)
+
+        # one row per game, one column per square, -1 for squares nobody owns
+        self.owner = np.full((num_games, BOARD.size), -1, dtype=np.int64)
+        self.ever_bought = np.zeros((num_games, BOARD.size), dtype=bool)
+
+        # everything Game keeps as a single value, one per game
+        self.curr_turn = np.zeros(num_games, dtype=np.int64)
+        self.num_turns_passed = np.zeros(num_games, dtype=np.int64)
+        self.num_trips_around = np.zeros(num_games, dtype=np.int64)
+        self.rent_level = np.zeros(num_games, dtype=np.int64)
+        self.num_unbought = np.full(num_games, len(BOARD.ownable_squares), dtype=np.int64)
+        self.num_eliminated = np.zeros(num_games, dtype=np.int64)
+        self.turn_last_property_bought = np.full(num_games, -1, dtype=np.int64)
+        self.trip_last_property_bought = np.full(num_games, -1, dtype=np.int64)
+        self.winner = np.full(num_games, -1, dtype=np.int64)
+        self.last_elimination_turn = np.zeros(num_games, dtype=np.int64)
+
+        # turn each game is cut off at without a winner, see Game.update_turn_limit
+        self.turn_limit = np.full(num_games, np.inf)
+        if self.max_turns is not None:
+            self.turn_limit[:] = self.max_turns
+        if self.stall_rounds is not None:
+            self.turn_limit = np.minimum(self.turn_limit, self.stall_rounds * self.num_players)
+        self.censored = np.zeros(num_games, dtype=bool)
+
+    # play every game through to the end
+    # games that reach their turn limit first are stopped and censored
+    def run(self):
+        games = np.flatnonzero(self.winner == -1)
+        while True:
+            games = games[self.winner[games] == -1]
+            cut_off = self.num_turns_passed[games] >= self.turn_limit[games]
+            self.censored[games[cut_off]] = True
+            games = games[~cut_off]
+            if len(games) <= HANDOFF_GAMES:
+                break
+
+            # eliminated players don't play, so those games go straight on to the next player still in the game
+            passing = self.eliminated[games, self.curr_turn[games]]
+            self.pass_eliminated_turns(games[passing])
+            self.step(games[~passing])
+
+        self.play_out(games)
+
+    # pass every turn up to the next player still in each game at once, see Game.pass_eliminated_turns
+    def pass_eliminated_turns(self, games):
+        turns = self.num_turns_passed[games]
+        after = (self.curr_turn[games][:, None] + np.arange(1, self.num_players + 1)) % self.num_players
+        num_turns = np.argmax(~self.eliminated[games[:, None], after], axis=1) + 1
+        num_turns = np.minimum(num_turns, self.turn_limit[games] - turns).astype(np.int64)
+
+        rent_period = self.num_players * self.rounds_before_jacking_rent
+        first_turn = np.maximum(turns, max(self.rounds_before_jacking_rent, 1))
+        last_turn = turns + num_turns - 1
+        rises = np.where(last_turn >= first_turn, last_turn // rent_period - (first_turn - 1) // rent_period, 0)
+        self.rent_level[games] = np.minimum(5, self.rent_level[games] + rises)
+
+        self.num_turns_passed[games] += num_turns
+        self.curr_turn[games] = (self.curr_turn[games] + num_turns) % self.num_players
+
+    # play one turn in each of the given games, whose current players are all still in the game
+    def step(self, games):
+        # bump up rent tier if enough rounds have passed for each player
+        turns = self.num_turns_passed[games]
+        bump = ((turns >= self.rounds_before_jacking_rent)
+                & (turns % (self.num_players * self.rounds_before_jacking_rent) == 0)
+                & (self.rent_level[games] < 5))
+        self.rent_level[games[bump]] += 1
+
+        g = games
+        p = self.curr_turn[games]
+        self.serve_jail_time(g, p)
+
+        # roll your first pair of dice, doubles get you out of jail without serving your sentence
+        doubles, roll_total = self.roll_two_dice(len(g))
+        self.sentence[g[doubles], p[doubles]] = 0
+
+        # can move, but only if no sentence in Jail
+        free = self.sentence[g, p] == 0
+        g, p, doubles, roll_total = g[free], p[free], doubles[free], roll_total[free]
+        self.move_players(g, p, roll_total)
+
+        # if your first roll was doubles you can roll again
+        g, p = g[doubles], p[doubles]
+        doubles, roll_total = self.roll_two_dice(len(g))
+        self.move_players(g, p, roll_total)
+
+        # if your second roll was doubles, you can roll a third time
+        # third doubles in a row - go to jail, otherwise move normally
+        g, p = g[doubles], p[doubles]
+        doubles, roll_total = self.roll_two_dice(len(g))
+        self.go_to_jail(g[doubles], p[doubles])
+        self.move_players(g[~doubles], p[~doubles], roll_total[~doubles])
+
+        # go to next turn
+        self.num_turns_passed[games] += 1
+        self.curr_turn[games] = (self.curr_turn[games] + 1) % self.num_players
+
+    # players still in jail pay the fine if they can, otherwise serve another turn
+    # once the sentence is served they pay the fine anyway, and are eliminated if they can't
+    def serve_jail_time(self, g, p):
+        jailed = self.sentence[g, p] > 0
+        g, p = g[jailed], p[jailed]
+
+        can_pay = self.money[g, p] > 50
+        self.money[g[can_pay], p[can_pay]] -= 50
+        self.sentence[g[can_pay], p[can_pay]] = 0
+        self.sentence[g[~can_pay], p[~can_pay]] -= 1
+
+        served = self.sentence[g, p] == 0
+        g, p = g[served], p[served]
+        self.money[g, p] -= 50
+        broke = self.money[g, p] < 0
+        for game, player in zip(g[broke], p[broke]):
+            self.eliminate(game, player, BANK)
+
+    # roll two 6-sided die for a number of players, return which were doubles and the totals
+    def roll_two_dice(self, count):
+        rolls = self.rng.integers(1, 7, size=(2, count))
+        return rolls[0] == rolls[1], rolls[0] + rolls[1]
+
+    # send players to the Jail square with a 3 turn sentence
+    def go_to_jail(self, g, p):
+        self.space[g, p] = JAIL_SQUARE
+        self.sentence[g, p] = JAIL_SENTENCE
+
+    # move each player by their roll, paying them for passing GO, then land them
+    def move_players(self, g, p, roll_total):
+        old_space = self.space[g, p]
+        new_space = (old_space + roll_total) % BOARD.size
+        passed_go = new_space < old_space
+        self.money[g[passed_go], p[passed_go]] += 200
+        self.num_trips_around[g] += passed_go
+        self.space[g, p] = new_space
+        self.land(g, p, new_space)
+
+    # handles what happens when players land on each kind of square
+    # every game shows up at most once, so each one goes down exactly one branch
+    def land(self, g, p, squares):
+        kinds = KINDS[squares]
+        owners = self.owner[g, squares]
+
+        # landed on "Free Parking" - give 500 if optional rule on
+        if self.free_parking_gives_500:
+            parking = kinds == KIND_PARKING
+            self.money[g[parking], p[parking]] += 500
+
+        # landed on either "Tax" square - eliminate player if they can't pay
+        tax = kinds == KIND_TAX
+        tg, tp, cost = g[tax], p[tax], COSTS[squares[tax]]
+        can_pay = self.money[tg, tp] > cost
+        self.money[tg[can_pay], tp[can_pay]] -= cost[can_pay]
+        for game, player in zip(tg[~can_pay], tp[~can_pay]):
+            self.eliminate(game, player, BANK)
+
+        # landed on "Go to Jail"
+        goto = kinds == KIND_GOTO
+        self.go_to_jail(g[goto], p[goto])
+
+        # landed on an unowned property, utility or railroad
+        # buy it if they can afford it without hitting 0 dollars, otherwise maybe auction it
+        unowned = OWNABLE[squares] & (owners == -1)
+        ug, up, usq = g[unowned], p[unowned], squares[unowned]
+        can_buy = self.money[ug, up] > COSTS[usq]
+        self.buy(ug[can_buy], up[can_buy], usq[can_buy])
+        if self.properties_auctioned:
+            self.auction(ug[~can_buy], usq[~can_buy])
+
+        # landed on a square owned by someone else - pay rent to the owner
+        rent_due = (owners != -1) & (owners != p)
+        self.pay_rent(g[rent_due], p[rent_due], squares[rent_due], owners[rent_due])
+
+    # work out the rent for each square, and have each player pay it to the owner
+    def pay_rent(self, g, p, squares, owners):
+        kinds = KINDS[squares]
+        payment = np.zeros(len(g), dtype=np.int64)
+
+        # for properties, the amount to be paid is the rent
+        # unless the owning player owns all of the same colour, then then can charge twice the rent
+        prop = kinds == KIND_PROPERTY
+        members = GROUP_MEMBERS[GROUPS[squares[prop]]]
+        monopoly = np.all(self.owner[g[prop][:, None], members] == owners[prop][:, None], axis=1)
+        payment[prop] = RENTS[squares[prop], self.rent_level[g[prop]]] * np.where(monopoly, 2, 1)
+
+        # for railroads, 25 for 1, 50 for 2, 100 for 3, 200 for 4
+        rail = kinds == KIND_RAILROAD
+        railroads_owned = np.sum(self.owner[g[rail][:, None], RAILROADS] == owners[rail][:, None], axis=1)
+        payment[rail] = 25 * 2 ** (railroads_owned - 1)
+
+        # for utilities, 4 times a dice roll if one, 10 times a dice roll if both
+        util = kinds == KIND_UTILITY
+        utilities_owned = np.sum(self.owner[g[util][:, None], UTILITIES] == owners[util][:, None], axis=1)
+        dice = self.rng.integers(1, 7, size=len(utilities_owned))
+        payment[util] = dice * np.where(utilities_owned == 1, 4, 10)
+
+        # if the player can pay the rent they give the money to the owner of the square
+        can_pay = self.money[g, p] > payment
+        self.money[g[can_pay], p[can_pay]] -= payment[can_pay]
+        self.money[g[can_pay], owners[can_pay]] += payment[can_pay]
+
+        # if they can't, they give what they can, and the player is eliminated
+        for game, player, owner in zip(g[~can_pay], p[~can_pay], owners[~can_pay]):
+            self.money[game, owner] += self.money[game, player]
+            self.eliminate(game, player, owner)
+
+    # players buy squares, noting when the last square was bought for the first time
+    def buy(self, g, p, squares):
+        self.money[g, p] -= COSTS[squares]
+        self.owner[g, squares] = p
+
+        first_time = ~self.ever_bought[g, squares]
+        self.ever_bought[g, squares] = True
+        self.num_unbought[g[first_time]] -= 1
+
+        last = g[first_time & (self.num_unbought[g] == 0) & (self.turn_last_property_bought[g] == -1)]
+        self.turn_last_property_bought[last] = self.num_turns_passed[last]
+        self.trip_last_property_bought[last] = self.num_trips_around[last]
+
+    # auction one square in each game to a random player still in the game who can afford it
+    def auction(self, g, squares):
+        can_afford = ~self.eliminated[g] & (self.money[g] > COSTS[squares][:, None])
+        num_can_afford = can_afford.sum(axis=1)
+        sold = num_can_afford > 0
+        g, squares, can_afford = g[sold], squares[sold], can_afford[sold]
+
+        # pick the n-th player that can afford it, counting up from player 0
+        sell_to = self.rng.integers(0, num_can_afford[sold])
+        buyers = np.argmax(np.cumsum(can_afford, axis=1) > sell_to[:, None], axis=1)
+        self.buy(g, buyers, squares)
+
+    # player is removed from one game, creditor is the player they owed or BANK
+    def eliminate(self, game, player, creditor):
+        if not self.eliminated[game, player]:
+            self.num_eliminated[game] += 1
+            self.last_elimination_turn[game] = self.num_turns_passed[game]
+            if self.stall_rounds is not None:
+                stall_limit = self.last_elimination_turn[game] + self.stall_rounds * self.num_players
+                self.turn_limit[game] = stall_limit if self.max_turns is None else min(self.max_turns, stall_limit)
+        self.eliminated[game, player] = True
+        self.money[game, player] = 0
+
+        # if all but one player was eliminated, that player is the winner
+        if self.num_eliminated[game] >= self.num_players - 1:
+            self.winner[game] = np.flatnonzero(~self.eliminated[game])[-1]
+            return
+
+        # otherwise hand their squares, in board order, back to the bank to be
+        # auctioned off, or over to the player they couldn't pay
+        holdings = np.flatnonzero(self.owner[game] == player)
+        if creditor == BANK:
+            for square in holdings:
+                self.owner[game, square] = -1
+                self.auction(np.array([game]), np.array([square]))
+        else:
+            self.owner[game, holdings] = creditor
+
+    # play each of the given games out in a Game, from where it got to here, with dice seeded from this batch
+    def play_out(self, games):
+        seeds = self.rng.integers(0, 2**63, size=len(games))
+        for game, seed in zip(games.tolist(), seeds.tolist()):
+            counts = (int(self.curr_turn[game]), int(self.num_turns_passed[game]), int(self.num_trips_around[game]),
+                      int(self.rent_level[game]), int(self.turn_last_property_bought[game]),
+                      int(self.trip_last_property_bought[game]), int(self.winner[game]), bool(self.censored[game]),
+                      int(self.last_elimination_turn[game]), int(self.num_unbought[game]), int(self.num_eliminated[game]))
+            snapshot = GameSnapshot(self.ruleset, counts, self.money[game], self.space[game], self.sentence[game],
+                                    self.eliminated[game], self.owner[game], self.ever_bought[game],
+                                    TurnDice(seed).get_state())
+            scalar = self.ruleset.make_game()
+            scalar.restore(snapshot)
+            scalar.run()
+
+            stats = scalar.stats()
+            self.winner[game] = stats.winner
+            self.num_turns_passed[game] = stats.num_turns_passed
+            self.turn_last_property_bought[game] = stats.turn_last_property_bought
+            self.num_trips_around[game] = stats.num_trips_around
+            self.trip_last_property_bought[game] = stats.trip_last_property_bought
+            self.censored[game] = stats.censored
+
+    # collect the stats of every game once they have been run
+    def stats(self):
+        return [Stats(int(self.winner[i]), int(self.num_turns_passed[i]), int(self.turn_last_property_bought[i]),
+                      int(self.num_trips_around[i]), int(self.trip_last_property_bought[i]), bool(self.censored[i]))
+                for i in range(self.num_games)]
+
+# play a number of games with the given rules in lockstep and return their stats
+def run_batch(ruleset, num_games, seed=None):
+    batch = BatchGame(ruleset, num_games, seed)
+    batch.run()
+    return batch.stats()
@@ -0,0 +1,216 @@
+# Benchmarks for the simulation hot paths
+# plays fixed-seed workloads for a range of player counts under all four rulesets, times the
+# Game methods that run every turn and bootstrap_stats, and compares against a saved JSON baseline
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from Monopoly import (ENGINE_VERSION, GAME_TYPES, BOARD, Ruleset, Stats, bootstrap_stats, game_seeds)
+
+# player counts every game workload is run with
+PLAYER_COUNTS = (2, 4, 8, 15, 30)
+
+# games per workload, and the turn limit that keeps a runaway game from stalling the benchmark
+BENCHMARK_GAMES = 50
+BENCHMARK_MAX_TURNS = 20000
+
+# games tracked with tracemalloc to measure peak memory, which slows them down a lot
+MEMORY_GAMES = 5
+
+# every timing is repeated and the best kept, and each repeat of a game workload plays it over and over
+# until at least BENCHMARK_MIN_SECONDS have passed, as a workload of small games takes only a few
+# milliseconds and one short run is mostly timer and scheduler noise
+BENCHMARK_REPEATS = 5
+BENCHMARK_MIN_SECONDS = 0.2
+
+# how much worse than the baseline a result has to be before it is flagged
+REGRESSION_THRESHOLD = 0.10
+
+# play a fixed-seed workload of games, report turns and games per second and peak memory
+# each game is stopped after until_turn turns, and the speeds are the best of repeats
+def benchmark_games(ruleset, num_games, seed, until_turn=BENCHMARK_MAX_TURNS, repeats=BENCHMARK_REPEATS,
+                    min_seconds=BENCHMARK_MIN_SECONDS):
+    seeds = game_seeds(seed, num_games)
+    game = ruleset.make_game()
+
+    turns_per_second = 0
+    games_per_second = 0
+    for repeat in range(repeats):
+        turns = 0
+        games = 0
+        start = time.perf_counter()
+        while games == 0 or time.perf_counter() - start < min_seconds:
+            for game_seed in seeds:
+                game.reset(game_seed)
+                game.run(until_turn)
+                turns += game.num_turns_passed
+            games += num_games
+        elapsed = time.perf_counter() - start
+        if games / elapsed > games_per_second:
+            turns_per_second = turns / elapsed
+            games_per_second = games / elapsed
+
+    # run the first few games again, this time tracking memory
+    tracemalloc.start()
+    memory_game = ruleset.make_game()
+    for game_seed in seeds[:MEMORY_GAMES]:
+        memory_game.reset(game_seed)
+        memory_game.run(until_turn)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"turns_per_second": turns_per_second, "games_per_second": games_per_second,
+            "peak_memory_kb": peak / 1024}
+
+# a game part way through, with player 0 owning every ownable square and player 1
+# rich enough to land anywhere and pay any rent without being eliminated
+def owned_board_game(num_players, seed):
+    game = Ruleset(num_players, True, False, 10).make_game(seed)
+    for square in BOARD.ownable_squares:
+        game.player_buys_property(game.players[0], square)
+    game.rent_level = 3
+    game.players[0].money = 0
+    game.players[1].money = 10**12
+    return game
+
+# time a function called once per item, report the best calls per second of repeats
+def calls_per_second(function, items, repeats=BENCHMARK_REPEATS):
+    best = 0
+    for repeat in range(repeats):
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        best = max(best, len(items) / (time.perf_counter() - start))
+    return {"calls_per_second": best}
+
+def benchmark_move_player(num_calls, seed):
+    game = owned_board_game(4, seed)
+    player = game.players[1]
+    totals = np.random.default_rng(seed).integers(2, 13, num_calls).tolist()
+    return calls_per_second(lambda total: game.move_player(player, total), totals)
+
+def benchmark_land(num_calls, seed):
+    game = owned_board_game(4, seed)
+    player = game.players[1]
+    squares = np.random.default_rng(seed).integers(0, BOARD.size, num_calls).tolist()
+
+    def land(square):
+        player.space = square
+        player.sentence = 0
+        game.land(player)
+    return calls_per_second(land, squares)
+
+def benchmark_player_pays_rent(num_calls, seed):
+    game = owned_board_game(4, seed)
+    player = game.players[1]
+    squares = np.random.default_rng(seed).choice(BOARD.ownable_squares, num_calls).tolist()
+    return calls_per_second(lambda square: game.player_pays_rent(player, square), squares)
+
+# eliminating a player changes the game, so each call gets a fresh game and only the call is timed
+def benchmark_eliminate(num_calls, seed, repeats=BENCHMARK_REPEATS):
+    game = Ruleset(8, True, False, 10).make_game()
+    best = 0
+    for repeat in range(repeats):
+        elapsed = 0
+        for i in range(num_calls):
+            game.reset(seed + i)
+            for square in BOARD.ownable_squares[::3]:
+                game.player_buys_property(game.players[i % 2], square)
+            creditor = "bank" if i % 2 == 0 else game.players[2]
+            start = time.perf_counter()
+            game.eliminate(game.players[i % 2], creditor)
+            elapsed += time.perf_counter() - start
+        best = max(best, num_calls / elapsed)
+    return {"calls_per_second": best}
+
+# bootstrap 500 made up games 10000 times, the driver's default workload
+def benchmark_bootstrap(num_calls, seed):
+    rng = np.random.default_rng(seed)
+    trips = np.where(rng.random(500) < 0.3, -1, rng.integers(5, 50, 500))
+    games = [Stats(0, int(turns), 0, 0, int(trip)) for turns, trip in zip(rng.integers(100, 5000, 500), trips)]
+    return calls_per_second(lambda _: bootstrap_stats(games, 10000, rng=rng), range(num_calls))
+
+# run every benchmark, results keyed by name
+def run_benchmarks(player_counts=PLAYER_COUNTS, num_games=BENCHMARK_GAMES, seed=0, scale=1):
+    results = {}
+    for num_players in player_counts:
+        for game_type, (title, properties_auctioned, free_parking_gives_500) in enumerate(GAME_TYPES, 1):
+            ruleset = Ruleset(num_players, properties_auctioned, free_parking_gives_500, 10)
+            name = "game_type_" + str(game_type) + "/players_" + str(num_players)
+            results[name] = benchmark_games(ruleset, num_games, seed)
+            print_result(name, results[name])
+
+    micro_benchmarks = [("move_player", benchmark_move_player, 200000),
+                        ("land", benchmark_land, 200000),
+                        ("player_pays_rent", benchmark_player_pays_rent, 200000),
+                        ("eliminate", benchmark_eliminate, 5000),
+                        ("bootstrap_stats", benchmark_bootstrap, 5)]
+    for name, benchmark, num_calls in micro_benchmarks:
+        results[name] = benchmark(max(1, int(num_calls * scale)), seed)
+        print_result(name, results[name])
+    return results
+
+def print_result(name, result):
+    print(name.ljust(32) + "  ".join(metric + "=" + format(value, ".1f") for metric, value in result.items()))
+
+# compare results against a baseline, a metric is flagged when it is more than threshold worse
+# per-second metrics are worse when lower, memory is worse when higher
+def find_regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            if name not in baseline or metric not in baseline[name]:
+                continue
+            base = baseline[name][metric]
+            if metric.endswith("_per_second"):
+                change = (base - value) / base
+            else:
+                change = (value - base) / base
+            if change > threshold:
+                regressions.append((name, metric, base, value, change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Monopoly simulation hot paths.")
+    parser.add_argument("--players", type=int, nargs="+", default=list(PLAYER_COUNTS), help="player counts to benchmark")
+    parser.add_argument("--games", type=int, default=BENCHMARK_GAMES, help="games per workload")
+    parser.add_argument("--seed", type=int, default=0, help="seed for every workload")
+    parser.add_argument("--scale", type=float, default=1, help="scale the number of calls in the method benchmarks")
+    parser.add_argument("--save", help="write the results as a JSON baseline to this file")
+    parser.add_argument("--compare", help="compare against a JSON baseline written by --save")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="fraction worse than the baseline that counts as a regression")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.players, args.games, args.seed, args.scale)
+
+    if args.save is not None:
+        report = {"engine_version": ENGINE_VERSION, "python": platform.python_version(),
+                  "numpy": np.__version__, "machine": platform.machine(), "results": results}
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        # a different engine plays different games from the same seeds, so game workloads can't be compared like for like
+        if baseline.get("engine_version") != ENGINE_VERSION:
+            print("WARNING: the baseline was made by engine version " + str(baseline.get("engine_version")) + ", this is "
+                  + str(ENGINE_VERSION) + " - the same seeds play different games, so game workloads aren't comparable")
+        regressions = find_regressions(results, baseline["results"], args.threshold)
+        for name, metric, base, value, change in regressions:
+            print("REGRESSION " + name + " " + metric + ": " + format(base, ".1f") + " -> "
+                  + format(value, ".1f") + " (" + format(100 * change, ".0f") + "% worse)")
+        if len(regressions) > 0:
+            return 1
+        print("no regressions above " + format(100 * args.threshold, ".0f") + "%")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+# Markov-chain model of one player's movement around the board
+# each state is a square plus the turns left on a jail sentence, and one step of the chain is
+# one whole turn as Game.run plays it: two dice, rolling again on doubles, jail on a third
+# doubles, Go To Jail, and the 3 turn sentence
+# solving for the stationary distribution gives how often each square is landed on per turn,
+# and from that the rent each square earns per turn at every rent level, without playing games
+
+import argparse
+
+import numpy as np
+
+from Monopoly import BOARD, DiceStream, KIND_GOTO, KIND_PROPERTY, KIND_RAILROAD, KIND_UTILITY, Ruleset, TurnDice
+
+JAIL_SQUARE = 10
+JAIL_SENTENCE = 3
+
+# states are (square, turns left in jail), numbered square by square
+NUM_SENTENCES = JAIL_SENTENCE + 1
+NUM_STATES = BOARD.size * NUM_SENTENCES
+
+# what a player with turns left in jail does at the start of their turn
+# "pay": they have more than 50 dollars, so they pay the fine and move as normal
+# "serve": they can't pay, so they wait out their sentence unless they roll doubles
+JAIL_POLICIES = ("pay", "serve")
+
+def state_index(square, sentence):
+    return square * NUM_SENTENCES + sentence
+
+# chance of each total of two dice, split into doubles and not doubles
+def roll_probabilities():
+    doubles = np.zeros(13)
+    not_doubles = np.zeros(13)
+    for roll1 in range(1, 7):
+        for roll2 in range(1, 7):
+            if roll1 == roll2:
+                doubles[roll1 + roll2] += 1 / 36
+            else:
+                not_doubles[roll1 + roll2] += 1 / 36
+    return doubles, not_doubles
+
+# a matrix that sends every state to one other state
+def state_map(destination):
+    matrix = np.zeros((NUM_STATES, NUM_STATES))
+    for square in range(BOARD.size):
+        for sentence in range(NUM_SENTENCES):
+            matrix[state_index(square, sentence), state_index(*destination(square, sentence))] = 1
+    return matrix
+
+# moving by a dice total: where each state ends up, and which square it lands on
+# landing on Go To Jail sends the player to jail with a full sentence
+def move_matrices(roll_total):
+    moves = np.zeros((NUM_STATES, NUM_STATES))
+    landings = np.zeros((NUM_STATES, BOARD.size))
+    for square in range(BOARD.size):
+        new_square = (square + roll_total) % BOARD.size
+        for sentence in range(NUM_SENTENCES):
+            state = state_index(square, sentence)
+            landings[state, new_square] = 1
+            if BOARD.kinds[new_square] == KIND_GOTO:
+                moves[state, state_index(JAIL_SQUARE, JAIL_SENTENCE)] = 1
+            else:
+                moves[state, state_index(new_square, sentence)] = 1
+    return moves, landings
+
+# the chain for one whole turn: row i of the turn matrix is where a player starting the turn
+# in state i ends it, and row i of the landing matrix is how often they land on each square on the way
+def turn_matrices(policy="pay"):
+    if policy not in JAIL_POLICIES:
+        raise ValueError("jail policy must be one of " + str(JAIL_POLICIES))
+    doubles, not_doubles = roll_probabilities()
+    chance_of_doubles = doubles.sum()
+
+    # moving on a roll of doubles, and on a roll that isn't, weighted by the chance of each total
+    doubles_move = np.zeros((NUM_STATES, NUM_STATES))
+    doubles_landings = np.zeros((NUM_STATES, BOARD.size))
+    not_doubles_move = np.zeros((NUM_STATES, NUM_STATES))
+    not_doubles_landings = np.zeros((NUM_STATES, BOARD.size))
+    for roll_total in range(2, 13):
+        moves, landings = move_matrices(roll_total)
+        doubles_move += doubles[roll_total] * moves
+        doubles_landings += doubles[roll_total] * landings
+        not_doubles_move += not_doubles[roll_total] * moves
+        not_doubles_landings += not_doubles[roll_total] * landings
+
+    # start of the turn: a player in jail either pays their way out or serves a turn of their sentence
+    if policy == "pay":
+        start = state_map(lambda square, sentence: (square, 0))
+    else:
+        start = state_map(lambda square, sentence: (square, max(sentence - 1, 0)))
+
+    # doubles get a player out of jail, and only players out of jail move
+    release = state_map(lambda square, sentence: (square, 0))
+    free = np.diag([1.0 if index % NUM_SENTENCES == 0 else 0.0 for index in range(NUM_STATES)])
+    still_jailed = np.eye(NUM_STATES) - free
+    to_jail = state_map(lambda square, sentence: (JAIL_SQUARE, JAIL_SENTENCE))
+
+    # first roll - no doubles: move if free, otherwise stay put; doubles: leave jail, move, roll again
+    turn = start @ free @ not_doubles_move + (1 - chance_of_doubles) * start @ still_jailed
+    landing = start @ free @ not_doubles_landings
+    after_first_doubles = start @ release @ doubles_move
+    landing += start @ release @ doubles_landings
+
+    # second roll - no doubles ends the turn, doubles means rolling a third time
+    # (the player moves even if the first move landed them in jail)
+    turn += after_first_doubles @ not_doubles_move
+    landing += after_first_doubles @ not_doubles_landings
+    after_second_doubles = after_first_doubles @ doubles_move
+    landing += after_first_doubles @ doubles_landings
+
+    # third roll - doubles again is straight to jail, otherwise move normally
+    turn += after_second_doubles @ not_doubles_move + chance_of_doubles * after_second_doubles @ to_jail
+    landing += after_second_doubles @ not_doubles_landings
+    return turn, landing
+
+# the long-run share of turns a player starts in each state
+def stationary_distribution(turn):
+    system = turn.T - np.eye(NUM_STATES)
+    system[-1, :] = 1
+    target = np.zeros(NUM_STATES)
+    target[-1] = 1
+    return np.linalg.solve(system, target)
+
+# expected number of landings on each square per turn, for one player
+def landing_rates(policy="pay"):
+    turn, landing = turn_matrices(policy)
+    return stationary_distribution(turn) @ landing
+
+# rent charged for one landing on each square at each rent level, given how much of its group
+# the owner holds: monopoly doubles property rent, and railroad and utility rent depend on how
+# many of them the owner has (utility rent uses the average dice roll of 3.5)
+def rent_per_landing(monopoly=False, railroads_owned=1, utilities_owned=1):
+    rent = np.zeros(BOARD.rent_array.shape)
+    for square in range(BOARD.size):
+        kind = BOARD.kinds[square]
+        if kind == KIND_PROPERTY:
+            rent[square] = BOARD.rent_array[square] * (2 if monopoly else 1)
+        elif kind == KIND_RAILROAD:
+            rent[square] = 25 * 2 ** (railroads_owned - 1)
+        elif kind == KIND_UTILITY:
+            rent[square] = 3.5 * (4 if utilities_owned == 1 else 10)
+    return rent
+
+# expected rent per turn each square earns from one opponent, one row per square and one column per rent level
+def expected_rent(policy="pay", monopoly=False, railroads_owned=1, utilities_owned=1):
+    return landing_rates(policy)[:, None] * rent_per_landing(monopoly, railroads_owned, utilities_owned)
+
+# expected rent per turn for each group (colours, then railroads, then utilities), owning the whole group
+def group_rent(policy="pay"):
+    railroads = len(BOARD.group_members[BOARD.railroad_group])
+    utilities = len(BOARD.group_members[BOARD.utility_group])
+    rent = expected_rent(policy, True, railroads, utilities)
+    return np.array([rent[list(members)].sum(axis=0) for members in BOARD.group_members])
+
+# walk one player around the board with real dice for a number of turns, using the same
+# movement rules as Game.run, and return how often they landed on each square per turn
+def simulated_landing_rates(num_turns, policy="pay", seed=None):
+    dice = DiceStream(seed)
+    landings = np.zeros(BOARD.size, dtype=np.int64)
+    square = 0
+    sentence = 0
+
+    def move(roll_total):
+        nonlocal square, sentence
+        square = (square + roll_total) % BOARD.size
+        landings[square] += 1
+        if BOARD.kinds[square] == KIND_GOTO:
+            square = JAIL_SQUARE
+            sentence = JAIL_SENTENCE
+
+    for turn in range(num_turns):
+        if sentence > 0:
+            sentence = 0 if policy == "pay" else sentence - 1
+        doubles, roll_total = dice.roll_two()
+        if doubles:
+            sentence = 0
+        if sentence == 0:
+            move(roll_total)
+            if doubles:
+                doubles, roll_total = dice.roll_two()
+                move(roll_total)
+                if doubles:
+                    doubles, roll_total = dice.roll_two()
+                    if doubles:
+                        square = JAIL_SQUARE
+                        sentence = JAIL_SENTENCE
+                    else:
+                        move(roll_total)
+    return landings / num_turns
+
+# the same walk with each turn drawn whole from the turn outcome table, the way Game.run draws them
+def sampled_landing_rates(num_turns, policy="pay", seed=None):
+    dice = TurnDice(seed)
+    landings = np.zeros(BOARD.size, dtype=np.int64)
+    square = 0
+    sentence = 0
+
+    for turn in range(num_turns):
+        if sentence > 0:
+            sentence = 0 if policy == "pay" else sentence - 1
+        doubles, roll_totals, jail_roll = dice.roll_turn()
+        if doubles:
+            sentence = 0
+        if sentence == 0:
+            for roll_total in roll_totals:
+                square = (square + roll_total) % BOARD.size
+                landings[square] += 1
+                if BOARD.kinds[square] == KIND_GOTO:
+                    square = JAIL_SQUARE
+                    sentence = JAIL_SENTENCE
+            if jail_roll:
+                square = JAIL_SQUARE
+                sentence = JAIL_SENTENCE
+    return landings / num_turns
+
+# how a turn's dice went: 0, 1 or 2 doubles before a pair that isn't, or 3 for three doubles and jail
+def turn_kind(outcome):
+    doubles, roll_totals, jail_roll = outcome
+    return 3 if jail_roll else len(roll_totals) - 1
+
+# compare the turn outcome table with rolling a pair of dice at a time, both in how each kind of turn
+# turns up and in the landing rates they lead to, returns the largest difference in units of the
+# standard error of the difference, which should stay below about 4
+def check_turn_table(num_turns=200000, policy="pay", seed=0):
+    rolled = simulated_landing_rates(num_turns, policy, seed)
+    sampled = sampled_landing_rates(num_turns, policy, seed)
+    standard_error = np.sqrt(np.maximum(rolled + sampled, 1e-12) / num_turns)
+    worst = np.max(np.abs(rolled - sampled) / standard_error)
+
+    rolled_kinds, sampled_kinds = (np.bincount([turn_kind(dice.roll_turn()) for turn in range(num_turns)], minlength=4) / num_turns
+                                   for dice in (DiceStream(seed), TurnDice(seed)))
+    variance = rolled_kinds * (1 - rolled_kinds) + sampled_kinds * (1 - sampled_kinds)
+    standard_error = np.sqrt(np.maximum(variance, 1e-12) / num_turns)
+    return max(worst, np.max(np.abs(rolled_kinds - sampled_kinds) / standard_error))
+
+# play a real instrumented Game with every player too rich to ever be eliminated, so every turn is
+# played and a player in jail always pays their way out (the "pay" policy), and return how often
+# the players landed on each square per turn
+def game_landing_rates(num_turns, seed=None, num_players=4):
+    game = Ruleset(num_players, True, False, 10, max_turns=num_turns).make_game(seed, instrument=True)
+    for player in game.players:
+        player.money = 10**12
+    game.run()
+    return game.counters.landings / game.num_turns_passed
+
+# compare the solved landing rates with ones from play, returns the largest difference
+# in units of the play's standard error, which should stay below about 4
+# the "pay" policy is checked against real Games, "serve" can't be forced on a Game and is
+# checked against simulated_landing_rates
+def check_against_simulation(num_turns=200000, policy="pay", seed=0):
+    solved = landing_rates(policy)
+    if policy == "pay":
+        simulated = game_landing_rates(num_turns, seed)
+    else:
+        simulated = simulated_landing_rates(num_turns, policy, seed)
+    standard_error = np.sqrt(np.maximum(solved, 1e-12) / num_turns)
+    return np.max(np.abs(solved - simulated) / standard_error)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve the Monopoly movement Markov chain.")
+    parser.add_argument("--policy", choices=JAIL_POLICIES, default="pay", help="what players in jail do")
+    parser.add_argument("--check", type=int, default=0, metavar="TURNS",
+                        help="also compare with this many turns of real Game play (simulated turns for --policy serve)")
+    parser.add_argument("--check-table", type=int, default=0, metavar="TURNS",
+                        help="also compare this many turns drawn from the turn outcome table with rolled ones")
+    args = parser.parse_args(argv)
+
+    rates = landing_rates(args.policy)
+    print("LANDINGS PER TURN (one player):")
+    for square in np.argsort(-rates):
+        print("    " + BOARD.names[square].ljust(24) + format(rates[square], ".4f"))
+
+    print("EXPECTED RENT PER OPPONENT TURN, WHOLE GROUP OWNED, BY RENT LEVEL:")
+    for group, rent in enumerate(group_rent(args.policy)):
+        name = BOARD.names[BOARD.group_members[group][0]]
+        print("    group of " + name.ljust(24) + " ".join(format(value, "8.2f") for value in rent))
+
+    if args.check > 0:
+        worst = check_against_simulation(args.check, args.policy)
+        print("LARGEST DIFFERENCE FROM PLAY: " + format(worst, ".2f") + " standard errors")
+
+    if args.check_table > 0:
+        worst = check_turn_table(args.check_table, args.policy)
+        print("LARGEST DIFFERENCE OF TURN TABLE FROM ROLLED DICE: " + format(worst, ".2f") + " standard errors")
+
+if __name__ == "__main__":
+    main()
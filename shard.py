@@ -0,0 +1,273 @@
+# Campaigns sharded over a shared directory, for running on several machines without a scheduler
+# init splits the four game types x a number of games into seeded work-unit files, any number of
+# work processes on any host claim units by creating a claim file, play them and write their stats,
+# and merge joins the stats back up and bootstraps them like Monopoly.main
+# a claim that isn't refreshed for claim_timeout seconds is treated as a crashed worker and the unit is
+# handed out again - a worker that was only slow notices its claim is gone and drops the unit, and
+# units are seeded, so even a unit played twice writes the same stats both times
+
+import argparse
+import json
+import os
+import socket
+import time
+
+import numpy as np
+
+from Monopoly import (ENGINE_VERSION, GAME_TYPES, RUNNER_CHUNK_SIZE, STATS_DTYPE, Ruleset, as_seed_sequence,
+                      bootstrap_stats, game_seeds, play_games, print_summary, stats_array)
+from sweep import ruleset_values
+
+# games per work unit
+SHARD_UNIT_SIZE = 500
+
+# seconds without a refresh before a claim counts as abandoned, and between looks for work
+CLAIM_TIMEOUT = 600
+POLL_INTERVAL = 5
+
+# a campaign directory holds campaign.json, and units/, claims/ and results/ with one file per unit
+class ShardedCampaign:
+    def __init__(self, directory):
+        self.directory = directory
+        self.campaign_path = os.path.join(directory, "campaign.json")
+        self.units_dir = os.path.join(directory, "units")
+        self.claims_dir = os.path.join(directory, "claims")
+        self.results_dir = os.path.join(directory, "results")
+
+    # split a campaign into unit files, rulesets is a dict of name to Ruleset
+    # every ruleset plays games 0 to num_games - 1 of the same root seed, like run_games with that seed
+    def create(self, rulesets, num_games, seed=None, unit_size=SHARD_UNIT_SIZE):
+        if os.path.exists(self.campaign_path):
+            raise ValueError(self.directory + " already holds a campaign")
+        for directory in (self.units_dir, self.claims_dir, self.results_dir):
+            os.makedirs(directory, exist_ok=True)
+        entropy = as_seed_sequence(seed).entropy
+
+        units = []
+        for name, ruleset in rulesets.items():
+            for first_game in range(0, num_games, unit_size):
+                unit = {"name": name + "_" + str(first_game).zfill(9), "ruleset_name": name,
+                        "ruleset": ruleset_values(ruleset), "entropy": entropy, "first_game": first_game,
+                        "num_games": min(unit_size, num_games - first_game)}
+                write_shared(os.path.join(self.units_dir, unit["name"] + ".json"), json.dumps(unit))
+                units.append(unit["name"])
+
+        # written last, so a campaign with a campaign.json has all of its units
+        campaign = {"engine": ENGINE_VERSION, "entropy": entropy, "num_games": num_games, "unit_size": unit_size,
+                    "rulesets": {name: ruleset_values(ruleset) for name, ruleset in rulesets.items()},
+                    "units": units}
+        write_shared(self.campaign_path, json.dumps(campaign))
+
+    def campaign(self):
+        with open(self.campaign_path) as file:
+            return json.load(file)
+
+    def unit(self, name):
+        with open(os.path.join(self.units_dir, name + ".json")) as file:
+            return json.load(file)
+
+    def claim_path(self, name):
+        return os.path.join(self.claims_dir, name + ".claim")
+
+    def result_path(self, name):
+        return os.path.join(self.results_dir, name + ".npy")
+
+    def is_done(self, name):
+        return os.path.exists(self.result_path(name))
+
+    # try to claim a unit, creating its claim file only if nobody else has
+    # a claim older than claim_timeout is taken over by renaming it to a name only this worker uses,
+    # so when several workers find the same stale claim only one of them gets to move it away
+    def claim(self, name, claim_timeout=CLAIM_TIMEOUT):
+        path = self.claim_path(name)
+        owner = json.dumps({"host": socket.gethostname(), "pid": os.getpid(), "time": time.time()})
+        for attempt in range(2):
+            try:
+                descriptor = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if attempt > 0 or not self.is_expired(name, claim_timeout):
+                    return False
+                stale_path = path + "." + socket.gethostname() + "." + str(os.getpid()) + ".stale"
+                try:
+                    os.rename(path, stale_path)
+                except FileNotFoundError:
+                    # another worker moved it first
+                    return False
+                # the claim was refreshed or replaced after we looked at it, so put it back
+                if time.time() - os.path.getmtime(stale_path) <= claim_timeout:
+                    try:
+                        os.link(stale_path, path)
+                    except FileExistsError:
+                        pass
+                    os.remove(stale_path)
+                    return False
+                os.remove(stale_path)
+                continue
+            with os.fdopen(descriptor, "w") as file:
+                file.write(owner)
+            return True
+        return False
+
+    def is_expired(self, name, claim_timeout=CLAIM_TIMEOUT):
+        try:
+            return time.time() - os.path.getmtime(self.claim_path(name)) > claim_timeout
+        except FileNotFoundError:
+            return True
+
+    # whether the claim file of a unit is still this worker's, rather than gone or taken over
+    def holds_claim(self, name):
+        try:
+            with open(self.claim_path(name)) as file:
+                owner = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return False
+        return owner["host"] == socket.gethostname() and owner["pid"] == os.getpid()
+
+    # show the claim is still being worked on, returns False if it has been lost to another worker
+    def refresh(self, name):
+        if not self.holds_claim(name):
+            return False
+        try:
+            os.utime(self.claim_path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    # give up a claim, unless another worker has taken it over
+    def release(self, name):
+        if not self.holds_claim(name):
+            return
+        try:
+            os.remove(self.claim_path(name))
+        except FileNotFoundError:
+            pass
+
+    # play one claimed unit a chunk at a time, refreshing the claim between chunks, and write its stats
+    # stops without writing anything if the claim is lost, returns whether the stats were written
+    def play(self, name, chunk_size=RUNNER_CHUNK_SIZE):
+        unit = self.unit(name)
+        ruleset = Ruleset(*unit["ruleset"])
+        seeds = game_seeds(np.random.SeedSequence(unit["entropy"]), unit["num_games"], unit["first_game"])
+        stats = []
+        for first in range(0, len(seeds), chunk_size):
+            stats.extend(play_games(ruleset, seeds[first:first + chunk_size]))
+            if not self.refresh(name):
+                return False
+        array = stats_array(stats)
+        write_shared(self.result_path(name), lambda file: np.save(file, array))
+        self.release(name)
+        return True
+
+    # units by state: done, claimed by a live worker, and free to be claimed
+    def status(self, claim_timeout=CLAIM_TIMEOUT):
+        done, claimed, free = [], [], []
+        for name in self.campaign()["units"]:
+            if self.is_done(name):
+                done.append(name)
+            elif os.path.exists(self.claim_path(name)) and not self.is_expired(name, claim_timeout):
+                claimed.append(name)
+            else:
+                free.append(name)
+        return done, claimed, free
+
+    # claim and play units until every unit is done, waiting on units other workers hold in case
+    # their claims expire, returns how many units this worker played
+    def work(self, claim_timeout=CLAIM_TIMEOUT, poll_interval=POLL_INTERVAL, max_units=None):
+        campaign = self.campaign()
+        if campaign["engine"] != ENGINE_VERSION:
+            raise ValueError("campaign in " + self.directory + " was made by engine version " + str(campaign["engine"]))
+        num_played = 0
+        while max_units is None or num_played < max_units:
+            done, claimed, free = self.status(claim_timeout)
+            if len(free) == 0 and len(claimed) == 0:
+                break
+            played = False
+            for name in free:
+                if not self.is_done(name) and self.claim(name, claim_timeout):
+                    if self.play(name):
+                        num_played += 1
+                    played = True
+                    break
+            if not played:
+                time.sleep(poll_interval)
+        return num_played
+
+    # the stats of every game of one ruleset, in game order
+    # raises if any of its units aren't done yet
+    def merge(self, ruleset_name):
+        campaign = self.campaign()
+        names = [name for name in campaign["units"] if self.unit(name)["ruleset_name"] == ruleset_name]
+        missing = [name for name in names if not self.is_done(name)]
+        if len(missing) > 0:
+            raise ValueError(str(len(missing)) + " units of " + ruleset_name + " aren't done yet")
+        if len(names) == 0:
+            return np.empty(0, dtype=STATS_DTYPE)
+        return np.concatenate([np.load(self.result_path(name)) for name in names])
+
+# write a file other hosts may be writing at the same time, through a temp file of our own
+def write_shared(path, content):
+    temp_path = path + "." + socket.gethostname() + "." + str(os.getpid()) + ".tmp"
+    with open(temp_path, "wb") as file:
+        if callable(content):
+            content(file)
+        else:
+            file.write(content.encode())
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a Monopoly campaign as work units in a shared directory.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init = commands.add_parser("init", help="split a campaign of the four game types into work units")
+    init.add_argument("directory")
+    init.add_argument("--players", type=int, default=15, help="number of players in each game")
+    init.add_argument("--games", type=int, default=500, help="number of games per game type")
+    init.add_argument("--rent-interval", type=int, default=10, help="rounds before the rent of every property goes up")
+    init.add_argument("--max-turns", type=int, default=None, help="turn budget, games still going after it are censored")
+    init.add_argument("--stall-rounds", type=int, default=None,
+                      help="censor a game once this many rounds pass with nobody eliminated")
+    init.add_argument("--unit-size", type=int, default=SHARD_UNIT_SIZE, help="games per work unit")
+    init.add_argument("--seed", type=int, default=None, help="root seed, for reproducible runs")
+
+    work = commands.add_parser("work", help="claim and play units until the campaign is done")
+    work.add_argument("directory")
+    work.add_argument("--claim-timeout", type=float, default=CLAIM_TIMEOUT,
+                      help="seconds before a claim that isn't refreshed is handed out again")
+    work.add_argument("--max-units", type=int, default=None, help="stop after playing this many units")
+
+    status = commands.add_parser("status", help="count units done, claimed and free")
+    status.add_argument("directory")
+    status.add_argument("--claim-timeout", type=float, default=CLAIM_TIMEOUT)
+
+    merge = commands.add_parser("merge", help="join up the stats of a finished campaign and bootstrap them")
+    merge.add_argument("directory")
+    merge.add_argument("--bootstrap", type=int, default=10000, help="number of bootstrap resamples")
+    merge.add_argument("--seed", type=int, default=None, help="seed for the bootstrap resampling")
+    merge.add_argument("--output-dir", help="also save each game type's stats here as a .npy file")
+    args = parser.parse_args(argv)
+
+    campaign = ShardedCampaign(args.directory)
+    if args.command == "init":
+        rulesets = {"game_type_" + str(game_type): Ruleset(args.players, properties_auctioned, free_parking_gives_500,
+                                                           args.rent_interval, args.max_turns, args.stall_rounds)
+                    for game_type, (title, properties_auctioned, free_parking_gives_500) in enumerate(GAME_TYPES, 1)}
+        campaign.create(rulesets, args.games, args.seed, args.unit_size)
+        print("split into " + str(len(campaign.campaign()["units"])) + " units")
+    elif args.command == "work":
+        print("played " + str(campaign.work(args.claim_timeout, max_units=args.max_units)) + " units")
+    elif args.command == "status":
+        done, claimed, free = campaign.status(args.claim_timeout)
+        print(str(len(done)) + " done, " + str(len(claimed)) + " claimed, " + str(len(free)) + " free")
+    elif args.command == "merge":
+        for game_type, (title, _, _) in enumerate(GAME_TYPES, 1):
+            name = "game_type_" + str(game_type)
+            results = campaign.merge(name)
+            if args.output_dir is not None:
+                os.makedirs(args.output_dir, exist_ok=True)
+                np.save(os.path.join(args.output_dir, name + ".npy"), results)
+            print_summary(title, bootstrap_stats(results, args.bootstrap, rng=np.random.default_rng(args.seed)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# Parameter sweeps - play every combination of a grid of rulesets and summarize each one
+# work is split into (ruleset, block of game seeds) units, and the stats of every finished
+# unit are cached on disk, so rerunning a sweep with a few new grid points only plays those
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+
+import numpy as np
+
+from Monopoly import (ENGINE_VERSION, Ruleset, RunningEstimates, game_seeds, play_games, stats_array,
+                      write_atomically)
+
+# the ruleset parameters a grid can vary, in the order they are passed to Ruleset
+GRID_PARAMETERS = ("num_players", "properties_auctioned", "free_parking_gives_500", "rounds_before_jacking_rent",
+                   "max_turns", "stall_rounds")
+
+# parameters a grid can leave out, and the value they take when it does
+GRID_DEFAULTS = {"max_turns": None, "stall_rounds": None}
+
+# how many games make up one unit of work
+SWEEP_BLOCK_SIZE = 100
+
+# every ruleset in a grid, a dict of parameter name to a list of values (or a single value)
+def grid_rulesets(grid):
+    values = []
+    for name in GRID_PARAMETERS:
+        if name not in grid and name not in GRID_DEFAULTS:
+            raise ValueError("grid is missing a value for " + name)
+        value = grid.get(name, GRID_DEFAULTS.get(name))
+        values.append(value if isinstance(value, (list, tuple)) else [value])
+    return [Ruleset(*combination) for combination in product(*values)]
+
+def ruleset_values(ruleset):
+    return [getattr(ruleset, name) for name in GRID_PARAMETERS]
+
+# name of the cache file for one unit of work, a hash of everything that decides its results
+def unit_key(ruleset, entropy, first_game, num_games):
+    unit = {"engine": ENGINE_VERSION, "ruleset": ruleset_values(ruleset), "entropy": entropy,
+            "first_game": first_game, "num_games": num_games}
+    return hashlib.sha256(json.dumps(unit, sort_keys=True).encode()).hexdigest()
+
+# play one unit of work, this is the job each worker process runs
+def play_unit(ruleset, entropy, first_game, num_games):
+    seeds = game_seeds(np.random.SeedSequence(entropy), num_games, first_game)
+    return stats_array(play_games(ruleset, seeds))
+
+# play every ruleset in the grid for a number of games each, reusing any units already in the cache,
+# and return a summary table with one row (a dict) per ruleset
+def sweep(grid, games_per_ruleset, cache_dir, seed=0, block_size=SWEEP_BLOCK_SIZE, max_workers=None, confidence=95):
+    os.makedirs(cache_dir, exist_ok=True)
+    entropy = np.random.SeedSequence(seed).entropy
+    rulesets = grid_rulesets(grid)
+
+    # work out every unit, and which of them still need to be played
+    units = {}
+    missing = []
+    for ruleset in rulesets:
+        units[id(ruleset)] = []
+        for first_game in range(0, games_per_ruleset, block_size):
+            num_games = min(block_size, games_per_ruleset - first_game)
+            path = os.path.join(cache_dir, unit_key(ruleset, entropy, first_game, num_games) + ".npy")
+            units[id(ruleset)].append(path)
+            if not os.path.exists(path):
+                missing.append((ruleset, first_game, num_games, path))
+
+    # play the missing units, caching each one as soon as it finishes
+    if len(missing) > 0:
+        with ProcessPoolExecutor(max_workers) as pool:
+            jobs = {pool.submit(play_unit, ruleset, entropy, first_game, num_games): path
+                    for ruleset, first_game, num_games, path in missing}
+            for job in as_completed(jobs):
+                results = job.result()
+                write_atomically(jobs[job], lambda file: np.save(file, results))
+
+    # summarize every ruleset from its cached units
+    table = []
+    for ruleset in rulesets:
+        estimates = RunningEstimates()
+        for path in units[id(ruleset)]:
+            estimates.add(np.load(path, mmap_mode="r"))
+        row = dict(zip(GRID_PARAMETERS, ruleset_values(ruleset)))
+        row["games"] = estimates.num_games
+        row["mean_turns_passed"] = estimates.turns.mean()
+        row["turns_half_width"] = estimates.turns.half_width(confidence)
+        row["mean_trip_last_property_bought"] = estimates.trips.mean()
+        row["trips_half_width"] = estimates.trips.half_width(confidence)
+        row["percent_all_props_bought"] = estimates.percent_all_props_bought()
+        row["percent_half_width"] = estimates.percent_half_width(confidence)
+        row["censored"] = estimates.num_censored
+        table.append(row)
+    return table
+
+# write a summary table to a CSV file
+def write_table(table, path):
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=list(table[0].keys()))
+        writer.writeheader()
+        writer.writerows(table)
+
+# command line flags take "yes"/"no" for the two optional rules
+def parse_flag(text):
+    if text.lower() in ("yes", "true", "1"):
+        return True
+    if text.lower() in ("no", "false", "0"):
+        return False
+    raise argparse.ArgumentTypeError("expected yes or no, got " + text)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep a grid of Monopoly rulesets, caching finished work on disk.")
+    parser.add_argument("--players", type=int, nargs="+", default=[15], help="numbers of players")
+    parser.add_argument("--auctioned", type=parse_flag, nargs="+", default=[True, False], help="properties auctioned (yes/no)")
+    parser.add_argument("--free-parking", type=parse_flag, nargs="+", default=[False, True], help="free parking gives 500 (yes/no)")
+    parser.add_argument("--rent-interval", type=int, nargs="+", default=[10], help="rounds before rent goes up")
+    parser.add_argument("--max-turns", type=int, nargs="+", default=[None], help="turn budgets, games past them are censored")
+    parser.add_argument("--stall-rounds", type=int, nargs="+", default=[None],
+                        help="rounds without an elimination before a game is censored")
+    parser.add_argument("--games", type=int, default=500, help="games per ruleset")
+    parser.add_argument("--cache-dir", default="sweep_cache", help="directory for cached units of work")
+    parser.add_argument("--seed", type=int, default=0, help="root seed shared by every ruleset")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, every core by default")
+    parser.add_argument("--output", help="write the summary table to this CSV file")
+    args = parser.parse_args(argv)
+
+    grid = {"num_players": args.players, "properties_auctioned": args.auctioned,
+            "free_parking_gives_500": args.free_parking, "rounds_before_jacking_rent": args.rent_interval,
+            "max_turns": args.max_turns, "stall_rounds": args.stall_rounds}
+    table = sweep(grid, args.games, args.cache_dir, args.seed, max_workers=args.workers)
+
+    if args.output is not None:
+        write_table(table, args.output)
+    for row in table:
+        print(", ".join(name + "=" + str(value) for name, value in row.items()))
+
+if __name__ == "__main__":
+    main()
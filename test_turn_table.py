@@ -0,0 +1,51 @@
+# Checks the whole-turn outcome table Game.run draws its dice from against rolling a pair at a time
+
+from fractions import Fraction
+
+import numpy as np
+
+from Monopoly import TURN_CODES, TURN_TABLE, DiceStream, TurnDice
+from markov import check_turn_table, turn_kind
+
+# the table's chance of each kind of turn, counted exactly over every code
+def kind_chances():
+    counts = np.bincount(TURN_TABLE.outcome_of_code, minlength=len(TURN_TABLE.outcomes))
+    chances = [Fraction(0)] * 4
+    for outcome, count in zip(TURN_TABLE.outcomes, counts.tolist()):
+        chances[turn_kind(outcome)] += Fraction(count, TURN_CODES)
+    return chances
+
+# no doubles, doubles then not, two doubles then not, and three doubles which is jail,
+# with doubles coming up 1 time in 6
+def test_kind_chances_match_the_rules():
+    doubles = Fraction(1, 6)
+    expected = [1 - doubles, doubles * (1 - doubles), doubles**2 * (1 - doubles), doubles**3]
+    assert expected == [Fraction(5, 6), Fraction(5, 36), Fraction(5, 216), Fraction(1, 216)]
+    assert kind_chances() == expected
+
+def test_probabilities_match_the_counts():
+    counts = np.bincount(TURN_TABLE.outcome_of_code)
+    assert np.allclose(TURN_TABLE.probabilities, counts / TURN_CODES)
+    assert np.isclose(TURN_TABLE.probabilities.sum(), 1)
+
+# every outcome of a pair at a time turns up in the table, with the same shape
+def test_rolled_outcomes_are_in_the_table():
+    outcomes = set(TURN_TABLE.outcomes)
+    dice = DiceStream(0)
+    for turn in range(20000):
+        assert dice.roll_turn() in outcomes
+
+def test_turns_match_rolled_dice():
+    assert check_turn_table(100000, "pay", seed=0) < 4
+    assert check_turn_table(100000, "serve", seed=1) < 4
+
+# a snapshot of the dice part way through a block carries on with the same turns
+def test_turn_dice_state_round_trips():
+    dice = TurnDice(3)
+    for turn in range(300):
+        dice.roll_turn()
+    state = dice.get_state()
+    expected = [dice.roll_turn() for turn in range(500)]
+    restored = TurnDice(99)
+    restored.set_state(state)
+    assert [restored.roll_turn() for turn in range(500)] == expected